@@ -1,11 +1,41 @@
-import sys
+import time
 import torch
 from perflab.env import get_env_info
+from perflab.interference import CacheEvictor, Interference, release_cpus, reserve_cpus
 from perflab.metrics import compute_percentiles, compute_throughput, compute_samples_per_sec, get_peak_rss_mb
-from perflab.models import get_model, is_vision_model, is_text_model
+from perflab.models import get_model, is_vision_model, maybe_compile, set_torch_threads
 from perflab.preprocess import preprocess_vision_batch, create_text_input
-from perflab.timing import Timer
+from perflab.timing import SegmentTimer, measure_timer_overhead_ns, subtract_overhead, summarize_overhead
 from perflab.utils import append_jsonl
+from perflab.workers import InferenceWorker
+
+
+def _make_forward(model):
+    def forward(inputs):
+        with torch.no_grad():
+            return model(inputs)
+    return forward
+
+
+def _run_loop(timer, iters, make_inputs, forward, live=None, before_iter=None):
+    # Bind everything the loop touches to locals; each iteration only writes
+    # perf_counter_ns stamps into the timer's preallocated array.
+    marks = timer.marks
+    stride = timer.stride
+    now = time.perf_counter_ns
+    for i in range(iters):
+        if before_iter is not None:
+            before_iter()
+        base = i * stride
+        marks[base] = now()
+        inputs = make_inputs()
+        marks[base + 1] = now()
+        _ = forward(inputs)
+        marks[base + 2] = now()
+        marks[base + 3] = now()
+        if live is not None:
+            live.record((marks[base + 3] - marks[base]) / 1e6)
+    timer.count = iters
 
 
 def run_benchmark(
@@ -19,87 +49,121 @@ def run_benchmark(
     interop_threads=1,
     channels_last=False,
     quantize=False,
+    executor="inline",
+    transport="pickle",
+    shm_slots=4,
+    calibration_iters=1000,
+    subtract_harness_overhead=False,
+    cache_state="warm",
+    evict_bytes=None,
+    interference="none",
+    interference_workers=1,
+    interference_cpus=None,
+    interference_bytes=None,
     out_path="results/runs.jsonl",
+    live=None,
 ):
-    if threads is not None:
-        try:
-            torch.set_num_threads(threads)
-        except RuntimeError:
-            pass
-    if interop_threads is not None:
-        try:
-            torch.set_num_interop_threads(interop_threads)
-        except RuntimeError:
-            pass
+    set_torch_threads(threads, interop_threads)
 
     if device == "cuda" and not torch.cuda.is_available():
         device = "cpu"
 
-    model = get_model(model_name, device, quantize=quantize, channels_last=channels_last)
+    is_vision = is_vision_model(model_name)
+    input_device = "cpu" if executor == "worker" else device
 
+    if is_vision:
+        segments = ["preprocess", "forward", "postprocess"]
+
+        def make_inputs():
+            return preprocess_vision_batch(batch_size, input_device, channels_last)
+    else:
+        segments = ["input", "forward", "postprocess"]
+
+        def make_inputs():
+            return create_text_input(batch_size, device=input_device)
+
+    # Reserve CPUs before any worker process is spawned so it inherits the pin.
+    bench_cpus = None
+    saved_affinity = None
+    if interference != "none" and interference_cpus is None:
+        bench_cpus, interference_cpus, saved_affinity = reserve_cpus(threads, interference_workers)
+
+    # Everything from here runs under try/finally, so a failure still shuts
+    # down the worker process and its shared memory, stops the hogs and gives
+    # this process its CPU affinity back.
+    worker = None
     compile_enabled = False
-    if compile_mode == "on" or (compile_mode == "auto" and sys.version_info >= (3, 8)):
-        try:
-            model = torch.compile(model)
-            compile_enabled = True
-        except Exception:
-            pass
-
-    is_vision = is_vision_model(model_name)
-    is_text = is_text_model(model_name)
-
-    warmup_timer = Timer()
-    for _ in range(warmup):
-        if is_vision:
-            warmup_timer.start_segment("preprocess")
-            inputs = preprocess_vision_batch(batch_size, device, channels_last)
-            warmup_timer.end_segment()
-            warmup_timer.start_segment("forward")
-            with torch.no_grad():
-                _ = model(inputs)
-            warmup_timer.end_segment()
-            warmup_timer.start_segment("postprocess")
-            warmup_timer.end_segment()
-        elif is_text:
-            warmup_timer.start_segment("forward")
-            inputs = create_text_input(batch_size, device=device)
-            with torch.no_grad():
-                _ = model(inputs)
-            warmup_timer.end_segment()
-
-    measure_timer = Timer()
-    end_to_end_times = []
-
-    for _ in range(iters):
-        import time
-        iter_start = time.perf_counter()
-
-        if is_vision:
-            measure_timer.start_segment("preprocess")
-            inputs = preprocess_vision_batch(batch_size, device, channels_last)
-            measure_timer.end_segment()
-
-            measure_timer.start_segment("forward")
-            with torch.no_grad():
-                _ = model(inputs)
-            measure_timer.end_segment()
-
-            measure_timer.start_segment("postprocess")
-            measure_timer.end_segment()
-
-        elif is_text:
-            measure_timer.start_segment("forward")
-            inputs = create_text_input(batch_size, device=device)
-            with torch.no_grad():
-                _ = model(inputs)
-            measure_timer.end_segment()
-
-        iter_end = time.perf_counter()
-        end_to_end_times.append((iter_end - iter_start) * 1000)
+    overhead = None
+    hogs = None
+    try:
+        if executor == "worker":
+            sample = make_inputs()
+            worker = InferenceWorker(
+                model_name,
+                sample.shape,
+                sample.dtype,
+                transport=transport,
+                device=device,
+                threads=threads,
+                interop_threads=interop_threads,
+                compile_mode=compile_mode,
+                channels_last=channels_last,
+                quantize=quantize,
+                shm_slots=shm_slots,
+            )
+            compile_enabled = worker.compile_enabled
+            forward = worker.infer
+        else:
+            model = get_model(model_name, device, quantize=quantize, channels_last=channels_last)
+            model, compile_enabled = maybe_compile(model, compile_mode)
+            forward = _make_forward(model)
+
+        if calibration_iters > 0:
+            calibration_timer = SegmentTimer(segments, calibration_iters)
+            sample = make_inputs()
+            _run_loop(calibration_timer, calibration_iters, lambda: sample, _make_forward(lambda x: x))
+            overhead = summarize_overhead(calibration_timer)
+
+        # Eviction runs between iterations, outside the timed region.
+        evictor = CacheEvictor(evict_bytes) if cache_state == "cold" else None
+        before_iter = evictor.evict if evictor is not None else None
+
+        if interference != "none":
+            hogs = Interference(
+                interference,
+                workers=interference_workers,
+                cpus=interference_cpus,
+                buffer_bytes=interference_bytes,
+            ).start()
+
+        warmup_timer = SegmentTimer(segments, warmup)
+        _run_loop(warmup_timer, warmup, make_inputs, forward, before_iter=before_iter)
+
+        if worker is not None:
+            worker.reset_stats(iters)
+
+        measure_timer = SegmentTimer(segments, iters)
+        _run_loop(measure_timer, iters, make_inputs, forward, live=live, before_iter=before_iter)
+    finally:
+        if hogs is not None:
+            hogs.stop()
+        if worker is not None:
+            worker.close()
+        release_cpus(saved_affinity)
+
+    if worker is not None:
+        worker_forward_times = worker.forward_times[:worker.stats_count]
+        transport_times = worker.transport_times[:worker.stats_count]
+
+    end_to_end_times = measure_timer.end_to_end_ms()
+    forward_times = measure_timer.get_iterations("forward")
+    overhead_subtracted = subtract_harness_overhead and overhead is not None
+    if overhead_subtracted:
+        end_to_end_times = subtract_overhead(end_to_end_times, overhead["end_to_end"])
+        forward_times = subtract_overhead(forward_times, overhead["forward"])
 
     warmup_totals = warmup_timer.get_totals()
     measure_means = measure_timer.get_means()
-    measure_totals = measure_timer.get_totals()
 
     percentiles = compute_percentiles(end_to_end_times)
     total_requests = iters * batch_size
@@ -121,9 +185,11 @@ def run_benchmark(
         "interop_threads": interop_threads,
         "channels_last": channels_last,
         "quantize": quantize,
+        "executor": executor,
+        "transport": transport if worker is not None else None,
         "warmup_ms_total": warmup_totals.get("forward", 0.0),
-        "measured_ms_total": measure_totals.get("forward", 0.0),
-        "forward_ms_per_batch": measure_means.get("forward", 0.0),
+        "measured_ms_total": sum(forward_times),
+        "forward_ms_per_batch": sum(forward_times) / len(forward_times),
         "end_to_end_ms_per_batch": sum(end_to_end_times) / len(end_to_end_times),
         "latency_p50": percentiles["p50"],
         "latency_p90": percentiles["p90"],
@@ -131,6 +197,18 @@ def run_benchmark(
         "latency_p99": percentiles["p99"],
         "throughput_rps": throughput_rps,
         "effective_samples_per_sec": samples_per_sec,
+        "harness_overhead_ms": overhead["end_to_end"] if overhead else None,
+        "forward_overhead_ms": overhead["forward"] if overhead else None,
+        "timer_overhead_ns": measure_timer_overhead_ns(),
+        "calibration_iters": calibration_iters,
+        "overhead_subtracted": overhead_subtracted,
+        "cache_state": cache_state,
+        "evict_bytes": evictor.size_bytes if evictor is not None else None,
+        "interference": interference,
+        "interference_workers": interference_workers if hogs is not None else 0,
+        "interference_cpus": interference_cpus if hogs is not None else None,
+        "interference_bytes": hogs.buffer_bytes if hogs is not None and interference == "membw" else None,
+        "cpu_affinity": bench_cpus,
         "peak_rss_mb": peak_rss,
         "env": env_info,
     }
@@ -138,6 +216,13 @@ def run_benchmark(
     if is_vision:
         result["preprocess_ms_per_batch"] = measure_means.get("preprocess", 0.0)
         result["postprocess_ms_per_batch"] = measure_means.get("postprocess", 0.0)
+    else:
+        result["input_ms_per_batch"] = measure_means.get("input", 0.0)
+
+    if worker is not None:
+        result["worker_forward_ms_per_batch"] = sum(worker_forward_times) / len(worker_forward_times)
+        result["transport_ms_per_batch"] = sum(transport_times) / len(transport_times)
+        result["transport_p99_ms"] = compute_percentiles(transport_times)["p99"]
 
     append_jsonl(out_path, result)
     return result
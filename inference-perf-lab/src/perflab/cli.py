@@ -1,11 +1,29 @@
 import argparse
 import os
 from perflab.bench import run_benchmark
+from perflab.coldstart import run_coldstart
+from perflab.generate import CACHE_MODES, run_generation
+from perflab.interference import CACHE_STATES, INTERFERENCE_KINDS
+from perflab.plan import run_plan
 from perflab.sweep import run_sweep
 from perflab.report import generate_report
+from perflab.serve import ENCODINGS, run_loadgen, run_server
+from perflab.tune import apply_profile_environment, load_profile_entry, run_tune_threads
+from perflab.workers import TRANSPORTS
 
 
 def cmd_bench(args):
+    if args.profile is not None:
+        entry = load_profile_entry(args.profile, args.model, args.batch_size, compile_mode=args.compile)
+        if entry is None:
+            print(f"No profile entry for {args.model} batch={args.batch_size} compile={args.compile}; "
+                  "using CLI thread settings")
+        else:
+            apply_profile_environment(entry)
+            args.threads = entry["threads"]
+            args.interop_threads = entry["interop_threads"]
+            print(f"Using tuned profile: threads={entry['threads']} interop={entry['interop_threads']} "
+                  f"env={entry['env_preset']} bind={entry['binding']}")
     run_benchmark(
         model_name=args.model,
         device=args.device,
@@ -17,6 +35,17 @@ def cmd_bench(args):
         interop_threads=args.interop_threads,
         channels_last=args.channels_last == "on",
         quantize=args.quantize == "on",
+        executor=args.executor,
+        transport=args.transport,
+        shm_slots=args.shm_slots,
+        calibration_iters=args.calibration_iters,
+        subtract_harness_overhead=args.subtract_overhead,
+        cache_state=args.cache_state,
+        evict_bytes=args.evict_mb * 1024 * 1024 if args.evict_mb else None,
+        interference=args.interference,
+        interference_workers=args.interference_workers,
+        interference_cpus=[int(c) for c in args.interference_cpus.split(",")] if args.interference_cpus else None,
+        interference_bytes=args.interference_mb * 1024 * 1024 if args.interference_mb else None,
         out_path=args.out,
     )
     print(f"Benchmark complete. Results appended to {args.out}")
@@ -27,6 +56,117 @@ def cmd_sweep(args):
         preset=args.preset,
         out_path=args.out,
         quick=args.quick,
+        progress_interval=args.progress_interval,
+        progress_path=args.progress_jsonl,
+        metrics_port=args.metrics_port,
+    )
+
+
+def cmd_coldstart(args):
+    run_coldstart(
+        model_name=args.model,
+        device=args.device,
+        batch_size=args.batch_size,
+        trials=args.trials,
+        compile_mode=args.compile,
+        threads=args.threads,
+        interop_threads=args.interop_threads,
+        channels_last=args.channels_last == "on",
+        quantize=args.quantize == "on",
+        cache_mode=args.cache_mode,
+        cache_dir=args.cache_dir,
+        steady_iters=args.steady_iters,
+        steady_window=args.steady_window,
+        steady_tolerance=args.steady_tolerance,
+        out_path=args.out,
+    )
+    print(f"Cold-start benchmark complete. Results appended to {args.out}")
+
+
+def cmd_generate(args):
+    run_generation(
+        model_name=args.model,
+        device=args.device,
+        batch_sizes=[int(bs) for bs in args.batch_sizes.split(",")],
+        prompt_lens=[int(n) for n in args.prompt_lens.split(",")],
+        new_tokens_list=[int(n) for n in args.new_tokens.split(",")],
+        cache_modes=args.cache.split(","),
+        iters=args.iters,
+        warmup=args.warmup,
+        threads=args.threads,
+        interop_threads=args.interop_threads,
+        quantize=args.quantize == "on",
+        out_path=args.out,
+    )
+    print(f"Generation benchmark complete. Results appended to {args.out}")
+
+
+def cmd_serve(args):
+    run_server(
+        model_name=args.model,
+        host=args.host,
+        port=args.port,
+        device=args.device,
+        executor=args.executor,
+        workers=args.workers,
+        threads=args.threads,
+        compile_mode=args.compile,
+        channels_last=args.channels_last == "on",
+        quantize=args.quantize == "on",
+    )
+
+
+def cmd_loadgen(args):
+    if args.connect is None and args.model is None:
+        raise SystemExit("perflab loadgen: --model is required unless --connect is given")
+    run_loadgen(
+        model_name=args.model,
+        batch_size=args.batch_size,
+        requests=args.requests,
+        warmup=args.warmup,
+        concurrency=args.concurrency,
+        encoding=args.encoding,
+        connect=args.connect,
+        device=args.device,
+        executor=args.executor,
+        workers=args.workers,
+        threads=args.threads,
+        compile_mode=args.compile,
+        channels_last=args.channels_last == "on",
+        quantize=args.quantize == "on",
+        out_path=args.out,
+    )
+    print(f"Load test complete. Results appended to {args.out}")
+
+
+def cmd_tune_threads(args):
+    run_tune_threads(
+        models=args.models.split(","),
+        batch_sizes=[int(bs) for bs in args.batch_sizes.split(",")],
+        iters=args.iters,
+        warmup=args.warmup,
+        compile_mode=args.compile,
+        objective=args.objective,
+        latency_pct=args.latency_pct,
+        max_threads=args.max_threads,
+        repeats=args.repeats,
+        min_gain=args.min_gain,
+        profile_path=args.profile_out,
+        out_path=args.out,
+    )
+
+
+def cmd_plan(args):
+    run_plan(
+        input_path=args.input,
+        model_name=args.model,
+        target_qps=args.target_qps,
+        slo_ms=args.slo_ms,
+        latency_pct=args.latency_pct,
+        host_cores=args.host_cores,
+        max_batch=args.max_batch,
+        top=args.top,
+        out_path=args.out,
     )
 
 
@@ -37,6 +177,8 @@ def cmd_report(args):
         constraint=args.constraint,
         latency_pct=args.latency_pct,
         latency_budget_ms=args.latency_budget_ms,
+        jobs=args.jobs,
+        use_cache=not args.rebuild,
     )
 
 
@@ -55,6 +197,28 @@ def main():
     bench_parser.add_argument("--interop-threads", type=int, default=1)
     bench_parser.add_argument("--channels-last", default="auto", choices=["on", "off", "auto"])
     bench_parser.add_argument("--quantize", default="off", choices=["on", "off"])
+    bench_parser.add_argument("--executor", default="inline", choices=["inline", "worker"],
+                              help="Run the model in this process or in a worker process")
+    bench_parser.add_argument("--transport", default="pickle", choices=TRANSPORTS,
+                              help="Tensor transport to the worker process")
+    bench_parser.add_argument("--shm-slots", type=int, default=4, help="Ring buffer slots for --transport shm")
+    bench_parser.add_argument("--calibration-iters", type=int, default=1000,
+                              help="No-op iterations used to measure harness overhead (0 to skip)")
+    bench_parser.add_argument("--subtract-overhead", action="store_true",
+                              help="Subtract calibrated harness overhead from reported latencies")
+    bench_parser.add_argument("--cache-state", default="warm", choices=CACHE_STATES,
+                              help="cold: evict CPU caches between iterations by streaming through a large buffer")
+    bench_parser.add_argument("--evict-mb", type=int, default=None,
+                              help="Eviction buffer size for --cache-state cold (default: 2x last-level cache)")
+    bench_parser.add_argument("--interference", default="none", choices=INTERFERENCE_KINDS,
+                              help="Co-located load during the run: memory-bandwidth or compute hogs")
+    bench_parser.add_argument("--interference-workers", type=int, default=1, help="Number of hog processes")
+    bench_parser.add_argument("--interference-cpus", default=None,
+                              help="Comma-separated CPUs for the hogs (default: SMT siblings, then same-socket cores)")
+    bench_parser.add_argument("--interference-mb", type=int, default=None,
+                              help="Buffer per membw hog (default: 2x last-level cache)")
+    bench_parser.add_argument("--profile", default=None,
+                              help="Load thread settings from a tune-threads profile (path, or 'auto' for this host)")
     bench_parser.add_argument("--out", default="results/runs.jsonl")
     bench_parser.set_defaults(func=cmd_bench)
 
@@ -62,14 +226,115 @@ def main():
     sweep_parser.add_argument("--preset", required=True, choices=["cpu_vision", "cpu_text"])
     sweep_parser.add_argument("--out", default=None)
     sweep_parser.add_argument("--quick", action="store_true", help="Reduce sweep size for fast testing")
+    sweep_parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between live updates")
+    sweep_parser.add_argument("--progress-jsonl", default=None, help="Append live progress snapshots to this file")
+    sweep_parser.add_argument("--metrics-port", type=int, default=None,
+                              help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics")
     sweep_parser.set_defaults(func=cmd_sweep)
 
+    coldstart_parser = subparsers.add_parser("coldstart", help="Measure time to first inference in fresh processes")
+    coldstart_parser.add_argument("--model", required=True, choices=["resnet18", "mobilenet_v3_small", "tiny_transformer"])
+    coldstart_parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
+    coldstart_parser.add_argument("--batch-size", type=int, default=1)
+    coldstart_parser.add_argument("--trials", type=int, default=5)
+    coldstart_parser.add_argument("--compile", default="auto", choices=["on", "off", "auto"])
+    coldstart_parser.add_argument("--threads", type=int, default=max(1, min(8, os.cpu_count() // 2)))
+    coldstart_parser.add_argument("--interop-threads", type=int, default=1)
+    coldstart_parser.add_argument("--channels-last", default="auto", choices=["on", "off", "auto"])
+    coldstart_parser.add_argument("--quantize", default="off", choices=["on", "off"])
+    coldstart_parser.add_argument("--cache-mode", default="both", choices=["fresh", "persist", "both"],
+                                  help="Compile cache per trial: fresh dir, one persisted dir, or both")
+    coldstart_parser.add_argument("--cache-dir", default=None, help="Persisted compile cache dir (default: temp dir)")
+    coldstart_parser.add_argument("--steady-iters", type=int, default=100)
+    coldstart_parser.add_argument("--steady-window", type=int, default=10)
+    coldstart_parser.add_argument("--steady-tolerance", type=float, default=0.1)
+    coldstart_parser.add_argument("--out", default="results/coldstart.jsonl")
+    coldstart_parser.set_defaults(func=cmd_coldstart)
+
+    generate_parser = subparsers.add_parser("generate", help="Benchmark autoregressive decoding (TTFT, inter-token latency)")
+    generate_parser.add_argument("--model", default="tiny_decoder", choices=["tiny_decoder"])
+    generate_parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
+    generate_parser.add_argument("--batch-sizes", default="1,4", help="Comma-separated batch sizes")
+    generate_parser.add_argument("--prompt-lens", default="32,128", help="Comma-separated prompt lengths")
+    generate_parser.add_argument("--new-tokens", default="32", help="Comma-separated output lengths")
+    generate_parser.add_argument("--cache", default=",".join(CACHE_MODES),
+                                 help=f"Comma-separated KV cache modes ({', '.join(CACHE_MODES)})")
+    generate_parser.add_argument("--iters", type=int, default=20)
+    generate_parser.add_argument("--warmup", type=int, default=3)
+    generate_parser.add_argument("--threads", type=int, default=max(1, min(8, os.cpu_count() // 2)))
+    generate_parser.add_argument("--interop-threads", type=int, default=1)
+    generate_parser.add_argument("--quantize", default="off", choices=["on", "off"])
+    generate_parser.add_argument("--out", default="results/generate.jsonl")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    def add_server_args(p, model_required=True):
+        p.add_argument("--model", required=model_required, choices=["resnet18", "mobilenet_v3_small", "tiny_transformer"])
+        p.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
+        p.add_argument("--executor", default="thread", choices=["thread", "process"])
+        p.add_argument("--workers", type=int, default=1)
+        p.add_argument("--threads", type=int, default=max(1, min(8, os.cpu_count() // 2)),
+                       help="Intra-op threads per worker")
+        p.add_argument("--compile", default="off", choices=["on", "off", "auto"])
+        p.add_argument("--channels-last", default="auto", choices=["on", "off", "auto"])
+        p.add_argument("--quantize", default="off", choices=["on", "off"])
+
+    serve_parser = subparsers.add_parser("serve", help="Run a minimal asyncio HTTP inference server")
+    add_server_args(serve_parser)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.set_defaults(func=cmd_serve)
+
+    loadgen_parser = subparsers.add_parser("loadgen", help="Measure end-to-end latency against the local server")
+    add_server_args(loadgen_parser, model_required=False)
+    loadgen_parser.add_argument("--connect", default=None,
+                                help="HOST:PORT of a running perflab server (default: spawn one)")
+    loadgen_parser.add_argument("--batch-size", type=int, default=1)
+    loadgen_parser.add_argument("--requests", type=int, default=500)
+    loadgen_parser.add_argument("--warmup", type=int, default=20)
+    loadgen_parser.add_argument("--concurrency", type=int, default=1)
+    loadgen_parser.add_argument("--encoding", default="raw", choices=ENCODINGS)
+    loadgen_parser.add_argument("--out", default="results/serve.jsonl")
+    loadgen_parser.set_defaults(func=cmd_loadgen)
+
+    tune_parser = subparsers.add_parser("tune-threads", help="Search thread/OpenMP settings and write a host profile")
+    tune_parser.add_argument("--models", required=True, help="Comma-separated model names")
+    tune_parser.add_argument("--batch-sizes", default="1", help="Comma-separated batch sizes")
+    tune_parser.add_argument("--iters", type=int, default=100)
+    tune_parser.add_argument("--warmup", type=int, default=10)
+    tune_parser.add_argument("--compile", default="auto", choices=["on", "off", "auto"],
+                             help="Compile mode to tune for; bench only uses entries tuned with its own --compile")
+    tune_parser.add_argument("--objective", default="latency", choices=["latency", "throughput"])
+    tune_parser.add_argument("--latency-pct", default="p95", choices=["p95", "p99"])
+    tune_parser.add_argument("--max-threads", type=int, default=None)
+    tune_parser.add_argument("--repeats", type=int, default=3, help="Runs per trial; trials are scored on the median")
+    tune_parser.add_argument("--min-gain", type=float, default=0.03,
+                             help="Relative improvement a trial needs to replace the current best")
+    tune_parser.add_argument("--profile-out", default=None, help="Profile path (default: profiles/<hostname>.json)")
+    tune_parser.add_argument("--out", default="results/tune_threads.jsonl")
+    tune_parser.set_defaults(func=cmd_tune_threads)
+
+    plan_parser = subparsers.add_parser("plan", help="Plan replicas and hosts for a target QPS and tail SLO")
+    plan_parser.add_argument("--input", required=True, help="Benchmark results (bench/sweep JSONL)")
+    plan_parser.add_argument("--model", required=True, choices=["resnet18", "mobilenet_v3_small", "tiny_transformer"])
+    plan_parser.add_argument("--target-qps", type=float, required=True)
+    plan_parser.add_argument("--slo-ms", type=float, required=True, help="Tail latency target per request")
+    plan_parser.add_argument("--latency-pct", default="p99", choices=["p95", "p99"])
+    plan_parser.add_argument("--host-cores", type=int, default=os.cpu_count(),
+                             help="Cores per host to pack replicas onto (default: this host)")
+    plan_parser.add_argument("--max-batch", type=int, default=None,
+                             help="Largest dynamic batch to consider (default: largest benchmarked)")
+    plan_parser.add_argument("--top", type=int, default=5, help="Number of plans to show")
+    plan_parser.add_argument("--out", default=None, help="Write the plans as JSON")
+    plan_parser.set_defaults(func=cmd_plan)
+
     report_parser = subparsers.add_parser("report", help="Generate a report from benchmark results")
     report_parser.add_argument("--input", required=True)
     report_parser.add_argument("--out", default="reports/latest.md")
     report_parser.add_argument("--constraint", default="balanced", choices=["latency", "throughput", "balanced"])
     report_parser.add_argument("--latency-pct", default="p95", choices=["p95", "p99"])
     report_parser.add_argument("--latency-budget-ms", type=float, default=50.0)
+    report_parser.add_argument("--jobs", type=int, default=None, help="Plot rendering processes (default: CPU count)")
+    report_parser.add_argument("--rebuild", action="store_true", help="Ignore cached aggregates and plots")
     report_parser.set_defaults(func=cmd_report)
 
     args = parser.parse_args()
@@ -0,0 +1,291 @@
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from perflab.utils import append_jsonl
+
+# Only stdlib modules are imported at the top of this file: the same module is
+# the entry point of every trial process, and anything imported here would be
+# billed to interpreter startup instead of the import phase.
+
+RESULT_PREFIX = "PERFLAB_RESULT "
+
+PHASES = [
+    "interpreter_ms",
+    "import_ms",
+    "construct_ms",
+    "weight_load_ms",
+    "compile_ms",
+    "first_inference_ms",
+    "time_to_first_inference_ms",
+    "time_to_steady_state_ms",
+]
+
+
+def find_steady_state(latencies, window=10, tolerance=0.1):
+    if not latencies:
+        return 0, 0.0
+    window = max(1, min(window, len(latencies)))
+    steady_ms = statistics.median(latencies[-window:])
+    threshold = steady_ms * (1 + tolerance)
+    for i in range(len(latencies) - window + 1):
+        if statistics.median(latencies[i:i + window]) <= threshold:
+            return i, steady_ms
+    return len(latencies) - window, steady_ms
+
+
+def get_cache_env(cache_dir):
+    return {
+        "TORCHINDUCTOR_CACHE_DIR": cache_dir,
+        "TORCHINDUCTOR_FX_GRAPH_CACHE": "1",
+        "TRITON_CACHE_DIR": os.path.join(cache_dir, "triton"),
+    }
+
+
+def _run_trial(config, launch_ts):
+    ready_ts = time.time()
+
+    t0 = time.perf_counter()
+    import torch
+    from perflab.env import get_env_info
+    from perflab.metrics import get_peak_rss_mb
+    from perflab.models import (
+        build_model, compile_requested, is_vision_model, load_pretrained_weights, prepare_model,
+        set_torch_threads, sync_device,
+    )
+    from perflab.preprocess import preprocess_vision_batch, create_text_input
+    import_ms = (time.perf_counter() - t0) * 1000
+
+    model_name = config["model_name"]
+    device = config["device"]
+    batch_size = config["batch_size"]
+    channels_last = config["channels_last"]
+
+    set_torch_threads(config["threads"], config["interop_threads"])
+
+    if device == "cuda" and not torch.cuda.is_available():
+        device = "cpu"
+
+    is_vision = is_vision_model(model_name)
+
+    def make_inputs():
+        if is_vision:
+            return preprocess_vision_batch(batch_size, device, channels_last)
+        return create_text_input(batch_size, device=device)
+
+    t0 = time.perf_counter()
+    model = build_model(model_name)
+    construct_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    load_pretrained_weights(model, model_name)
+    weight_load_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    model = prepare_model(
+        model, model_name, device, quantize=config["quantize"], channels_last=channels_last
+    )
+    sync_device(device)
+    construct_ms += (time.perf_counter() - t0) * 1000
+
+    compile_mode = config["compile_mode"]
+    compile_enabled = False
+    compile_ms = 0.0
+    if compile_requested(compile_mode):
+        t0 = time.perf_counter()
+        try:
+            compiled = torch.compile(model)
+            with torch.no_grad():
+                _ = compiled(make_inputs())
+            sync_device(device)
+            model = compiled
+            compile_enabled = True
+        except Exception:
+            pass
+        compile_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        _ = model(make_inputs())
+    sync_device(device)
+    first_inference_ms = (time.perf_counter() - t0) * 1000
+    first_inference_ts = time.time()
+
+    latencies = []
+    for _ in range(config["steady_iters"]):
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            _ = model(make_inputs())
+        sync_device(device)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    steady_idx, steady_ms = find_steady_state(
+        latencies, window=config["steady_window"], tolerance=config["steady_tolerance"]
+    )
+    time_to_first_inference_ms = (first_inference_ts - launch_ts) * 1000
+
+    return {
+        "compile": compile_enabled,
+        "device": device,
+        "interpreter_ms": (ready_ts - launch_ts) * 1000,
+        "import_ms": import_ms,
+        "construct_ms": construct_ms,
+        "weight_load_ms": weight_load_ms,
+        "compile_ms": compile_ms,
+        "first_inference_ms": first_inference_ms,
+        "time_to_first_inference_ms": time_to_first_inference_ms,
+        "steady_state_iters": steady_idx,
+        "steady_state_ms": steady_ms,
+        "time_to_steady_state_ms": time_to_first_inference_ms + sum(latencies[:steady_idx]),
+        "peak_rss_mb": get_peak_rss_mb(),
+        "env": get_env_info(),
+    }
+
+
+def launch_trial(config, cache_dir=None):
+    env = dict(os.environ)
+    if cache_dir is not None:
+        env.update(get_cache_env(cache_dir))
+
+    launch_ts = time.time()
+    cmd = [sys.executable, "-m", "perflab.coldstart", json.dumps(config), repr(launch_ts)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Cold-start trial failed:\n{proc.stderr[-2000:]}")
+
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Cold-start trial produced no result:\n{proc.stdout[-2000:]}")
+
+
+def summarize_trials(records):
+    summary = {}
+    for phase in PHASES:
+        values = [r[phase] for r in records if phase in r]
+        summary[phase] = statistics.median(values) if values else 0.0
+    return summary
+
+
+def print_summary(records):
+    groups = {}
+    for r in records:
+        key = f"{r['cache_mode']}/{r['cache_state']}"
+        groups.setdefault(key, []).append(r)
+
+    header = "| Phase (median ms) | " + " | ".join(groups) + " |"
+    print(header)
+    print("|" + "---|" * (len(groups) + 1))
+    summaries = {key: summarize_trials(group) for key, group in groups.items()}
+    for phase in PHASES:
+        row = " | ".join(f"{summaries[key][phase]:.1f}" for key in groups)
+        print(f"| {phase} | {row} |")
+
+    cold = [r for r in records if r["cache_state"] == "cold"]
+    warm = [r for r in records if r["cache_state"] == "warm"]
+    if cold and warm:
+        cold_ttfi = summarize_trials(cold)["time_to_first_inference_ms"]
+        warm_ttfi = summarize_trials(warm)["time_to_first_inference_ms"]
+        print(f"Warm compile cache saves {cold_ttfi - warm_ttfi:.1f} ms time-to-first-inference")
+
+
+def run_coldstart(
+    model_name,
+    device="cpu",
+    batch_size=1,
+    trials=5,
+    compile_mode="auto",
+    threads=None,
+    interop_threads=1,
+    channels_last=False,
+    quantize=False,
+    cache_mode="both",
+    cache_dir=None,
+    steady_iters=100,
+    steady_window=10,
+    steady_tolerance=0.1,
+    out_path="results/coldstart.jsonl",
+):
+    config = {
+        "model_name": model_name,
+        "device": device,
+        "batch_size": batch_size,
+        "compile_mode": compile_mode,
+        "threads": threads,
+        "interop_threads": interop_threads,
+        "channels_last": channels_last,
+        "quantize": quantize,
+        "steady_iters": steady_iters,
+        "steady_window": steady_window,
+        "steady_tolerance": steady_tolerance,
+    }
+
+    if compile_mode == "off":
+        cache_modes = ["none"]
+    elif cache_mode == "both":
+        cache_modes = ["fresh", "persist"]
+    else:
+        cache_modes = [cache_mode]
+
+    persist_dir = cache_dir
+    owns_persist_dir = False
+    if "persist" in cache_modes and persist_dir is None:
+        persist_dir = tempfile.mkdtemp(prefix="perflab_inductor_")
+        owns_persist_dir = True
+
+    records = []
+    try:
+        for mode in cache_modes:
+            for trial in range(1, trials + 1):
+                trial_dir = None
+                if mode == "fresh":
+                    trial_dir = tempfile.mkdtemp(prefix="perflab_inductor_")
+                elif mode == "persist":
+                    os.makedirs(persist_dir, exist_ok=True)
+                    trial_dir = persist_dir
+
+                if trial_dir is None:
+                    cache_state = "none"
+                elif os.listdir(trial_dir):
+                    cache_state = "warm"
+                else:
+                    cache_state = "cold"
+
+                print(f"[{mode} {trial}/{trials}] Launching cold-start trial ({cache_state} cache)")
+                try:
+                    trial_result = launch_trial(config, cache_dir=trial_dir)
+                finally:
+                    if mode == "fresh":
+                        shutil.rmtree(trial_dir, ignore_errors=True)
+
+                result = {
+                    "mode": "coldstart",
+                    "model": model_name,
+                    "batch_size": batch_size,
+                    "threads": threads,
+                    "interop_threads": interop_threads,
+                    "channels_last": channels_last,
+                    "quantize": quantize,
+                    "trial": trial,
+                    "cache_mode": mode,
+                    "cache_state": cache_state,
+                    "cache_dir": cache_dir if mode == "persist" else None,
+                }
+                result.update(trial_result)
+                append_jsonl(out_path, result)
+                records.append(result)
+    finally:
+        if owns_persist_dir:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+
+    print_summary(records)
+    return records
+
+
+if __name__ == "__main__":
+    result = _run_trial(json.loads(sys.argv[1]), float(sys.argv[2]))
+    print(RESULT_PREFIX + json.dumps(result))
@@ -3,6 +3,16 @@ import platform
 import sys
 import torch
 
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OMP_PROC_BIND",
+    "OMP_PLACES",
+    "OMP_WAIT_POLICY",
+    "KMP_AFFINITY",
+    "KMP_BLOCKTIME",
+]
+
 
 def get_env_info():
     info = {
@@ -12,7 +22,10 @@ def get_env_info():
         "platform_release": platform.release(),
         "cpu_count": os.cpu_count() or 1,
         "cuda_available": torch.cuda.is_available(),
+        "thread_env": {k: os.environ[k] for k in THREAD_ENV_VARS if k in os.environ},
     }
+    if hasattr(os, "sched_getaffinity"):
+        info["cpu_affinity_count"] = len(os.sched_getaffinity(0))
     if info["cuda_available"]:
         info["cuda_version"] = torch.version.cuda
         info["cuda_device_name"] = torch.cuda.get_device_name(0)
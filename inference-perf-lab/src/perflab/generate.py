@@ -0,0 +1,180 @@
+import itertools
+import time
+from array import array
+import torch
+from perflab.env import get_env_info
+from perflab.metrics import compute_percentiles, compute_throughput, get_peak_rss_mb
+from perflab.models import get_model, is_decoder_model, set_torch_threads, sync_device
+from perflab.preprocess import create_text_input
+from perflab.utils import append_jsonl
+
+CACHE_MODES = ["none", "dynamic", "static"]
+
+
+def _next_token(logits):
+    return logits[:, -1].argmax(dim=-1, keepdim=True)
+
+
+def generate_tokens(model, prompt, new_tokens, cache, marks, device="cpu"):
+    # marks[0] is the start, marks[i + 1] the time token i was available, so
+    # marks[1] - marks[0] is time to first token (prefill + first sample).
+    now = time.perf_counter_ns
+    with torch.no_grad():
+        marks[0] = now()
+        if cache is None:
+            # No cache: every step re-runs attention over the whole sequence.
+            tokens = prompt
+            for i in range(new_tokens):
+                next_token = _next_token(model(tokens))
+                tokens = torch.cat([tokens, next_token], dim=1)
+                sync_device(device)
+                marks[i + 1] = now()
+            return tokens[:, prompt.size(1):]
+
+        generated = []
+        next_token = _next_token(model(prompt, cache=cache, start_pos=0))
+        generated.append(next_token)
+        sync_device(device)
+        marks[1] = now()
+        pos = prompt.size(1)
+        for i in range(1, new_tokens):
+            next_token = _next_token(model(next_token, cache=cache, start_pos=pos))
+            generated.append(next_token)
+            pos += 1
+            sync_device(device)
+            marks[i + 1] = now()
+        return torch.cat(generated, dim=1)
+
+
+def run_generation_config(model, batch_size, prompt_len, new_tokens, cache_mode, iters=20, warmup=3, device="cpu"):
+    prompt = create_text_input(batch_size, seq_len=prompt_len, vocab_size=model.vocab_size, device=device)
+    static_cache = None
+    if cache_mode == "static":
+        static_cache = model.new_cache(batch_size, static=True, max_len=prompt_len + new_tokens, device=device)
+
+    def make_cache():
+        if cache_mode == "none":
+            return None
+        if cache_mode == "static":
+            return static_cache
+        return model.new_cache()
+
+    marks = array("q", bytes(8 * (new_tokens + 1)))
+    for _ in range(warmup):
+        generate_tokens(model, prompt, new_tokens, make_cache(), marks, device)
+
+    ttft_times = []
+    itl_times = []
+    total_times = []
+    for _ in range(iters):
+        generate_tokens(model, prompt, new_tokens, make_cache(), marks, device)
+        ttft_times.append((marks[1] - marks[0]) / 1e6)
+        itl_times.extend((marks[i + 1] - marks[i]) / 1e6 for i in range(1, new_tokens))
+        total_times.append((marks[new_tokens] - marks[0]) / 1e6)
+
+    ttft = compute_percentiles(ttft_times)
+    itl = compute_percentiles(itl_times)
+    return {
+        "batch_size": batch_size,
+        "prompt_len": prompt_len,
+        "new_tokens": new_tokens,
+        "cache": cache_mode,
+        "iters": iters,
+        "warmup": warmup,
+        "ttft_ms_mean": sum(ttft_times) / len(ttft_times),
+        "ttft_p50": ttft["p50"],
+        "ttft_p90": ttft["p90"],
+        "ttft_p95": ttft["p95"],
+        "ttft_p99": ttft["p99"],
+        "itl_ms_mean": sum(itl_times) / len(itl_times) if itl_times else 0.0,
+        "itl_p50": itl["p50"],
+        "itl_p90": itl["p90"],
+        "itl_p95": itl["p95"],
+        "itl_p99": itl["p99"],
+        "generation_ms_mean": sum(total_times) / len(total_times),
+        "tokens_per_sec": compute_throughput(iters * batch_size * new_tokens, sum(total_times)),
+        "decode_tokens_per_sec": compute_throughput(len(itl_times) * batch_size, sum(itl_times)),
+    }
+
+
+def print_cache_comparison(results):
+    baselines = {
+        (r["batch_size"], r["prompt_len"], r["new_tokens"]): r for r in results if r["cache"] == "none"
+    }
+    lines = []
+    for r in results:
+        base = baselines.get((r["batch_size"], r["prompt_len"], r["new_tokens"]))
+        if base is None or r is base or r["itl_ms_mean"] <= 0:
+            continue
+        lines.append(
+            f"  bs={r['batch_size']} prompt={r['prompt_len']} new={r['new_tokens']} {r['cache']}: "
+            f"decode {base['itl_ms_mean'] / r['itl_ms_mean']:.2f}x, "
+            f"tokens/s {r['tokens_per_sec'] / base['tokens_per_sec']:.2f}x vs no cache"
+        )
+    if lines:
+        print("Cache speedup:")
+        for line in lines:
+            print(line)
+
+
+def run_generation(
+    model_name="tiny_decoder",
+    device="cpu",
+    batch_sizes=(1,),
+    prompt_lens=(64,),
+    new_tokens_list=(32,),
+    cache_modes=CACHE_MODES,
+    iters=20,
+    warmup=3,
+    threads=None,
+    interop_threads=1,
+    quantize=False,
+    out_path="results/generate.jsonl",
+):
+    if not is_decoder_model(model_name):
+        raise ValueError(f"Generation needs a decoder model, got {model_name}")
+    unknown = [mode for mode in cache_modes if mode not in CACHE_MODES]
+    if unknown:
+        raise ValueError(f"Unknown cache mode(s) {unknown}, expected {CACHE_MODES}")
+
+    set_torch_threads(threads, interop_threads)
+
+    if device == "cuda" and not torch.cuda.is_available():
+        device = "cpu"
+
+    model = get_model(model_name, device, quantize=quantize)
+    longest = max(prompt_lens) + max(new_tokens_list)
+    if longest > model.max_seq_len:
+        raise ValueError(f"prompt + new tokens ({longest}) exceeds max_seq_len ({model.max_seq_len})")
+
+    env_info = get_env_info()
+    results = []
+    for batch_size, prompt_len, new_tokens, cache_mode in itertools.product(
+        batch_sizes, prompt_lens, new_tokens_list, cache_modes
+    ):
+        stats = run_generation_config(
+            model, batch_size, prompt_len, new_tokens, cache_mode, iters=iters, warmup=warmup, device=device
+        )
+        result = {
+            "mode": "generate",
+            "model": model_name,
+            "device": device,
+            "threads": threads,
+            "interop_threads": interop_threads,
+            "quantize": quantize,
+        }
+        result.update(stats)
+        result["peak_rss_mb"] = get_peak_rss_mb()
+        result["env"] = env_info
+        append_jsonl(out_path, result)
+        results.append(result)
+
+        print(
+            f"bs={batch_size} prompt={prompt_len} new={new_tokens} cache={cache_mode}: "
+            f"ttft p50={result['ttft_p50']:.2f}ms p99={result['ttft_p99']:.2f}ms, "
+            f"itl p50={result['itl_p50']:.2f}ms p99={result['itl_p99']:.2f}ms, "
+            f"{result['tokens_per_sec']:.1f} tok/s"
+        )
+
+    print_cache_comparison(results)
+    return results
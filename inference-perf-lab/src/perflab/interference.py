@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+from perflab.topology import get_cpu_topology, physical_cores
+
+CACHE_STATES = ["warm", "cold"]
+INTERFERENCE_KINDS = ["none", "membw", "compute"]
+DEFAULT_LLC_BYTES = 32 * 1024 * 1024
+
+
+def _parse_cache_size(text):
+    text = text.strip().upper()
+    units = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+
+def get_llc_bytes():
+    largest_level, size = 0, None
+    for index in glob.glob("/sys/devices/system/cpu/cpu0/cache/index*"):
+        try:
+            with open(os.path.join(index, "level")) as f:
+                level = int(f.read())
+            with open(os.path.join(index, "size")) as f:
+                index_size = _parse_cache_size(f.read())
+        except (OSError, ValueError):
+            continue
+        if level > largest_level:
+            largest_level, size = level, index_size
+    return size or DEFAULT_LLC_BYTES
+
+
+class CacheEvictor:
+    # Copies one buffer into another, which streams both through every cache
+    # level. The source is filled with real data up front: untouched pages all
+    # map to the kernel's zero page and would stay cached.
+    def __init__(self, size_bytes=None):
+        if size_bytes is None:
+            size_bytes = 2 * get_llc_bytes()
+        half = max(1, size_bytes // 2)
+        self.size_bytes = 2 * half
+        self.src = b"\x01" * half
+        self.dst = bytearray(half)
+
+    def evict(self):
+        self.dst[:] = self.src
+
+
+def plan_cpus(topology, threads, workers):
+    # The benchmark gets `threads` physical cores on the first socket; hogs go
+    # first to the SMT siblings of those cores, then to other cores on the same
+    # socket, so they share its last-level cache and memory controller.
+    socket_cpus = topology[min(topology)]
+    bench_cpus = physical_cores(socket_cpus)[:threads]
+    bench_cores = {core for cpu, core in socket_cpus if cpu in bench_cpus}
+    siblings = [cpu for cpu, core in socket_cpus if core in bench_cores and cpu not in bench_cpus]
+    neighbours = [cpu for cpu, core in socket_cpus if core not in bench_cores]
+    return bench_cpus, (siblings + neighbours)[:workers]
+
+
+def _hog_main(kind, cpu, buffer_bytes):
+    # Runs until the parent terminates it; "ready" goes out once the buffers
+    # are allocated so the measurement doesn't overlap the hog's startup.
+    # Ctrl-C reaches the whole process group, but the parent stops the hogs.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, [cpu])
+        except OSError:
+            pass
+
+    if kind == "membw":
+        src = b"\x01" * (buffer_bytes // 2)
+        dst = bytearray(len(src))
+        print("ready", flush=True)
+        while True:
+            dst[:] = src
+    else:
+        # Hashing a block that fits in L1 keeps the core's execution units busy
+        # without touching shared cache or memory.
+        block = b"\x01" * 16384
+        print("ready", flush=True)
+        while True:
+            hashlib.sha256(block).digest()
+
+
+class Interference:
+    def __init__(self, kind="membw", workers=1, cpus=None, buffer_bytes=None):
+        if kind not in INTERFERENCE_KINDS or kind == "none":
+            raise ValueError(f"Unknown interference kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.cpus = list(cpus) if cpus else []
+        self.buffer_bytes = buffer_bytes if buffer_bytes is not None else 2 * get_llc_bytes()
+        self.processes = []
+
+    def start(self, timeout=30):
+        for i in range(self.workers):
+            cpu = self.cpus[i] if i < len(self.cpus) else None
+            cmd = [sys.executable, "-m", "perflab.interference", self.kind, str(self.buffer_bytes)]
+            if cpu is not None:
+                cmd.append(str(cpu))
+            self.processes.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True))
+
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            ready, _, _ = select.select([process.stdout], [], [], max(0.0, deadline - time.monotonic()))
+            if not ready or process.stdout.readline().strip() != "ready":
+                self.stop()
+                raise RuntimeError(f"{self.kind} interference workers did not start within {timeout}s")
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def reserve_cpus(threads, workers):
+    # Pin this process (and any worker it spawns later) to its own cores so the
+    # scheduler can't move benchmark threads onto the hogs' CPUs. Returns the
+    # benchmark CPUs, the hog CPUs and the previous affinity to hand back to
+    # release_cpus(); the benchmark stays unpinned (None) when there is no
+    # spare CPU for the hogs.
+    if not hasattr(os, "sched_setaffinity"):
+        return None, [], None
+    bench_cpus, hog_cpus = plan_cpus(get_cpu_topology(), threads or 1, workers)
+    if not hog_cpus:
+        return None, [], None
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, bench_cpus)
+    return bench_cpus, hog_cpus, previous
+
+
+def release_cpus(previous):
+    if previous is not None:
+        os.sched_setaffinity(0, previous)
+
+
+if __name__ == "__main__":
+    _hog_main(sys.argv[1], int(sys.argv[3]) if len(sys.argv) > 3 else None, int(sys.argv[2]))
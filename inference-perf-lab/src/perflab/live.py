@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from perflab.metrics import compute_percentiles, compute_throughput
+from perflab.utils import append_jsonl
+
+
+# Single-writer ring buffer: the measured loop only stores a float and bumps an
+# int, both atomic under the GIL, so the reader thread never holds a lock the
+# loop could wait on. A snapshot may see one slot overwritten mid-copy, which is
+# fine for monitoring.
+class LiveStats:
+    def __init__(self, batch_size=1, capacity=1024):
+        self.batch_size = batch_size
+        self.capacity = capacity
+        self.latencies = array("d", bytes(8 * capacity))
+        self.count = 0
+
+    def record(self, latency_ms):
+        i = self.count
+        self.latencies[i % self.capacity] = latency_ms
+        self.count = i + 1
+
+    def snapshot(self):
+        count = self.count
+        n = min(count, self.capacity)
+        end = count % self.capacity
+        if n < self.capacity:
+            window = self.latencies[:n].tolist()
+        else:
+            window = self.latencies[end:].tolist() + self.latencies[:end].tolist()
+        return count, window
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{secs:02d}s"
+
+
+def estimate_eta(durations, remaining):
+    if not durations:
+        return None
+    return sum(durations) / len(durations) * remaining
+
+
+def format_prometheus(status):
+    lines = [
+        "# TYPE perflab_sweep_configs_total gauge",
+        f"perflab_sweep_configs_total {status['total_configs']}",
+        "# TYPE perflab_sweep_configs_completed gauge",
+        f"perflab_sweep_configs_completed {status['completed_configs']}",
+    ]
+    if status["eta_s"] is not None:
+        lines += ["# TYPE perflab_sweep_eta_seconds gauge", f"perflab_sweep_eta_seconds {status['eta_s']:.1f}"]
+
+    config = status.get("config")
+    if config is not None:
+        labels = ",".join(f'{k}="{v}"' for k, v in sorted(config.items()))
+        lines += [
+            "# TYPE perflab_iterations_total counter",
+            f"perflab_iterations_total{{{labels}}} {status['iterations']}",
+            "# TYPE perflab_seconds_since_last_iteration gauge",
+            f"perflab_seconds_since_last_iteration{{{labels}}} {status['idle_s']:.3f}",
+            "# TYPE perflab_throughput_rps gauge",
+            f"perflab_throughput_rps{{{labels}}} {status['throughput_rps']:.3f}",
+            "# TYPE perflab_latency_ms summary",
+        ]
+        for p in ["p50", "p90", "p95", "p99"]:
+            quantile = int(p[1:]) / 100
+            lines.append(f'perflab_latency_ms{{{labels},quantile="{quantile}"}} {status[f"latency_{p}"]:.4f}')
+    return "\n".join(lines) + "\n"
+
+
+class ProgressPublisher:
+    def __init__(self, interval=5.0, jsonl_path=None, metrics_port=None):
+        self.interval = interval
+        self.jsonl_path = jsonl_path
+        self.metrics_port = metrics_port
+        self.total_configs = 0
+        self.completed_durations = []
+        self.config_index = 0
+        self.config = None
+        self.stats = None
+        self.config_start = None
+        self.last_count = 0
+        self.last_time = None
+        self.last_change_time = None
+        self.status = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self, total_configs):
+        self.total_configs = total_configs
+        self.status = self._compute_status()
+        self._thread = threading.Thread(target=self._run, name="perflab-progress", daemon=True)
+        self._thread.start()
+        if self.metrics_port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.metrics_port), _make_handler(self))
+            threading.Thread(target=self._server.serve_forever, name="perflab-metrics", daemon=True).start()
+
+    def begin_config(self, index, config, batch_size):
+        with self._lock:
+            self.config_index = index
+            self.config = config
+            self.config_start = time.perf_counter()
+            self.last_count = 0
+            self.last_time = self.config_start
+            self.last_change_time = self.config_start
+            self.stats = LiveStats(batch_size=batch_size)
+            return self.stats
+
+    def end_config(self, duration_s):
+        self.completed_durations.append(duration_s)
+        self.publish()
+        with self._lock:
+            self.stats = None
+
+    def eta_s(self):
+        remaining = self.total_configs - len(self.completed_durations)
+        return estimate_eta(self.completed_durations, remaining)
+
+    def _compute_status(self):
+        status = {
+            "ts": time.time(),
+            "total_configs": self.total_configs,
+            "completed_configs": len(self.completed_durations),
+            "eta_s": self.eta_s(),
+        }
+        stats = self.stats
+        if stats is None:
+            return status
+
+        now = time.perf_counter()
+        count, window = stats.snapshot()
+        interval_ms = (now - self.last_time) * 1000
+        throughput = compute_throughput((count - self.last_count) * stats.batch_size, interval_ms)
+        if count != self.last_count:
+            self.last_change_time = now
+        self.last_count, self.last_time = count, now
+        percentiles = compute_percentiles(window)
+
+        status.update({
+            "config_index": self.config_index,
+            "config": self.config,
+            "iterations": count,
+            "elapsed_s": now - self.config_start,
+            "idle_s": now - self.last_change_time,
+            "latency_p50": percentiles["p50"],
+            "latency_p90": percentiles["p90"],
+            "latency_p95": percentiles["p95"],
+            "latency_p99": percentiles["p99"],
+            "throughput_rps": throughput,
+        })
+        return status
+
+    def publish(self):
+        # Called from both the publisher thread and end_config() on the main
+        # thread; never from inside the measured loop.
+        with self._lock:
+            self.status = self._compute_status()
+            if self.jsonl_path is not None:
+                append_jsonl(self.jsonl_path, self.status)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _make_handler(publisher):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = format_prometheus(publisher.status).encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/status":
+                body = json.dumps(publisher.status).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
@@ -1,5 +1,7 @@
-iimport torch
+import sys
+import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from torchvision import models
 
 
@@ -36,25 +38,158 @@ class TinyTransformerEncoder(nn.Module):
         return logits
 
 
-def get_model(name, device, quantize=False, channels_last=False):
-    model = None
+class KVCache:
+    # Grows by concatenation, so every decode step reallocates each layer's
+    # keys and values. This is what a naive implementation does.
+    def __init__(self, num_layers):
+        self.keys = [None] * num_layers
+        self.values = [None] * num_layers
+
+    def update(self, layer_idx, k, v, start_pos):
+        if self.keys[layer_idx] is None:
+            self.keys[layer_idx], self.values[layer_idx] = k, v
+        else:
+            self.keys[layer_idx] = torch.cat([self.keys[layer_idx][:, :, :start_pos], k], dim=2)
+            self.values[layer_idx] = torch.cat([self.values[layer_idx][:, :, :start_pos], v], dim=2)
+        return self.keys[layer_idx], self.values[layer_idx]
+
+
+class StaticKVCache:
+    # Preallocated for max_len positions and written in place. Positions past
+    # the current length are never read, so the cache is reused across
+    # generations without clearing.
+    def __init__(self, num_layers, batch_size, num_heads, max_len, head_dim, device="cpu", dtype=torch.float32):
+        shape = (batch_size, num_heads, max_len, head_dim)
+        self.max_len = max_len
+        self.keys = [torch.zeros(shape, device=device, dtype=dtype) for _ in range(num_layers)]
+        self.values = [torch.zeros(shape, device=device, dtype=dtype) for _ in range(num_layers)]
+
+    def update(self, layer_idx, k, v, start_pos):
+        end = start_pos + k.size(2)
+        if end > self.max_len:
+            raise ValueError(f"Static cache holds {self.max_len} positions, need {end}")
+        self.keys[layer_idx][:, :, start_pos:end] = k
+        self.values[layer_idx][:, :, start_pos:end] = v
+        return self.keys[layer_idx][:, :, :end], self.values[layer_idx][:, :, :end]
+
+
+class DecoderBlock(nn.Module):
+    def __init__(self, embed_dim, num_heads):
+        super().__init__()
+        self.num_heads = num_heads
+        self.head_dim = embed_dim // num_heads
+        self.ln1 = nn.LayerNorm(embed_dim)
+        self.qkv = nn.Linear(embed_dim, 3 * embed_dim)
+        self.proj = nn.Linear(embed_dim, embed_dim)
+        self.ln2 = nn.LayerNorm(embed_dim)
+        self.mlp = nn.Sequential(
+            nn.Linear(embed_dim, embed_dim * 4),
+            nn.GELU(),
+            nn.Linear(embed_dim * 4, embed_dim),
+        )
+
+    def forward(self, x, cache=None, layer_idx=0, start_pos=0):
+        b, t, c = x.shape
+        q, k, v = self.qkv(self.ln1(x)).split(c, dim=2)
+        q = q.view(b, t, self.num_heads, self.head_dim).transpose(1, 2)
+        k = k.view(b, t, self.num_heads, self.head_dim).transpose(1, 2)
+        v = v.view(b, t, self.num_heads, self.head_dim).transpose(1, 2)
+        if cache is not None:
+            k, v = cache.update(layer_idx, k, v, start_pos)
+
+        total = k.size(2)
+        if t == 1:
+            attn = F.scaled_dot_product_attention(q, k, v)
+        elif total == t:
+            attn = F.scaled_dot_product_attention(q, k, v, is_causal=True)
+        else:
+            mask = torch.ones(t, total, dtype=torch.bool, device=x.device).tril(diagonal=total - t)
+            attn = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+
+        x = x + self.proj(attn.transpose(1, 2).reshape(b, t, c))
+        x = x + self.mlp(self.ln2(x))
+        return x
+
+
+class TinyTransformerDecoder(nn.Module):
+    def __init__(
+        self,
+        vocab_size=10000,
+        embed_dim=256,
+        num_heads=4,
+        num_layers=4,
+        max_seq_len=512,
+    ):
+        super().__init__()
+        self.vocab_size = vocab_size
+        self.num_heads = num_heads
+        self.num_layers = num_layers
+        self.head_dim = embed_dim // num_heads
+        self.max_seq_len = max_seq_len
+        self.embedding = nn.Embedding(vocab_size, embed_dim)
+        self.pos_embedding = nn.Parameter(torch.randn(1, max_seq_len, embed_dim))
+        self.blocks = nn.ModuleList([DecoderBlock(embed_dim, num_heads) for _ in range(num_layers)])
+        self.ln_f = nn.LayerNorm(embed_dim)
+        self.lm_head = nn.Linear(embed_dim, vocab_size)
+
+    def new_cache(self, batch_size=1, static=False, max_len=None, device="cpu"):
+        if not static:
+            return KVCache(self.num_layers)
+        return StaticKVCache(
+            self.num_layers,
+            batch_size,
+            self.num_heads,
+            max_len or self.max_seq_len,
+            self.head_dim,
+            device=device,
+            dtype=self.pos_embedding.dtype,
+        )
+
+    def forward(self, input_ids, cache=None, start_pos=0):
+        t = input_ids.size(1)
+        x = self.embedding(input_ids)
+        x = x + self.pos_embedding[:, start_pos : start_pos + t, :]
+        for i, block in enumerate(self.blocks):
+            x = block(x, cache=cache, layer_idx=i, start_pos=start_pos)
+        logits = self.lm_head(self.ln_f(x))
+        return logits
 
+
+def build_model(name):
     if name == "resnet18":
-        model = models.resnet18(weights=models.ResNet18_Weights.DEFAULT)
+        return models.resnet18(weights=None)
     elif name == "mobilenet_v3_small":
-        model = models.mobilenet_v3_small(weights=models.MobileNet_V3_Small_Weights.DEFAULT)
+        return models.mobilenet_v3_small(weights=None)
     elif name == "tiny_transformer":
-        model = TinyTransformerEncoder()
-    else:
-        raise ValueError(f"Unknown model: {name}")
+        return TinyTransformerEncoder()
+    elif name == "tiny_decoder":
+        return TinyTransformerDecoder()
+    raise ValueError(f"Unknown model: {name}")
+
+
+def get_pretrained_weights(name):
+    if name == "resnet18":
+        return models.ResNet18_Weights.DEFAULT
+    elif name == "mobilenet_v3_small":
+        return models.MobileNet_V3_Small_Weights.DEFAULT
+    return None
+
+
+def load_pretrained_weights(model, name):
+    weights = get_pretrained_weights(name)
+    if weights is not None:
+        model.load_state_dict(weights.get_state_dict(progress=False))
+    return model
+
 
+def prepare_model(model, name, device, quantize=False, channels_last=False):
     model.eval()
     model.to(device)
 
     if channels_last and name in ["resnet18", "mobilenet_v3_small"]:
         model = model.to(memory_format=torch.channels_last)
 
-    if quantize and name == "tiny_transformer":
+    if quantize and is_text_model(name):
         try:
             model = torch.quantization.quantize_dynamic(
                 model, {nn.Linear}, dtype=torch.qint8
@@ -65,9 +200,52 @@ def get_model(name, device, quantize=False, channels_last=False):
     return model
 
 
+def get_model(name, device, quantize=False, channels_last=False):
+    model = build_model(name)
+    load_pretrained_weights(model, name)
+    return prepare_model(model, name, device, quantize=quantize, channels_last=channels_last)
+
+
+def set_torch_threads(threads=None, interop_threads=None):
+    # torch refuses to change the interop pool once parallel work has run in
+    # this process; the current setting is kept in that case.
+    if threads is not None:
+        try:
+            torch.set_num_threads(threads)
+        except RuntimeError:
+            pass
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+
+
+def compile_requested(compile_mode):
+    return compile_mode == "on" or (compile_mode == "auto" and sys.version_info >= (3, 8))
+
+
+def maybe_compile(model, compile_mode):
+    if compile_requested(compile_mode):
+        try:
+            return torch.compile(model), True
+        except Exception:
+            pass
+    return model, False
+
+
+def sync_device(device):
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+
 def is_vision_model(name):
     return name in ["resnet18", "mobilenet_v3_small"]
 
 
 def is_text_model(name):
-    return name == "tiny_transformer"
+    return name in ["tiny_transformer", "tiny_decoder"]
+
+
+def is_decoder_model(name):
+    return name == "tiny_decoder"
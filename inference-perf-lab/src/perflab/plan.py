@@ -0,0 +1,255 @@
+import json
+import math
+import os
+from perflab.utils import mkdirp, read_jsonl
+
+CONFIG_FIELDS = [
+    "device",
+    "executor",
+    "transport",
+    "compile",
+    "threads",
+    "interop_threads",
+    "channels_last",
+    "quantize",
+    "cache_state",
+    "interference",
+]
+
+
+def config_key(run):
+    return tuple(run.get(k) for k in CONFIG_FIELDS)
+
+
+def fit_linear(xs, ys):
+    n = len(xs)
+    if n == 0:
+        return 0.0, 0.0
+    if len(set(xs)) < 2:
+        # One batch size only: assume cost scales with batch, with no fixed part.
+        x_mean = sum(xs) / n
+        return 0.0, (sum(ys) / n) / x_mean if x_mean else 0.0
+    x_mean = sum(xs) / n
+    y_mean = sum(ys) / n
+    sxx = sum((x - x_mean) ** 2 for x in xs)
+    sxy = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+    slope = sxy / sxx
+    intercept = y_mean - slope * x_mean
+    if slope < 0:
+        return y_mean, 0.0
+    if intercept < 0:
+        return 0.0, sum(ys) / sum(xs)
+    return intercept, slope
+
+
+def fit_cost_models(runs, model_name, latency_pct="p99"):
+    latency_key = f"latency_{latency_pct}"
+    groups = {}
+    for run in runs:
+        if run.get("model") != model_name or "mode" in run:
+            continue
+        if not run.get("end_to_end_ms_per_batch") or not run.get(latency_key) or not run.get("threads"):
+            continue
+        groups.setdefault(config_key(run), []).append(run)
+
+    cost_models = []
+    for key, group in groups.items():
+        batch_sizes = [r["batch_size"] for r in group]
+        cost_models.append({
+            "config": dict(zip(CONFIG_FIELDS, key)),
+            "mean": fit_linear(batch_sizes, [r["end_to_end_ms_per_batch"] for r in group]),
+            "tail": fit_linear(batch_sizes, [r[latency_key] for r in group]),
+            "max_batch": max(batch_sizes),
+            "runs": len(group),
+        })
+    return cost_models
+
+
+def _eval(fit, batch):
+    intercept, slope = fit
+    return intercept + slope * batch
+
+
+def _utilization(cost_model, batch, rate):
+    service_ms = _eval(cost_model["mean"], batch)
+    return rate * service_ms / 1000 / batch if service_ms > 0 else float("inf")
+
+
+def operating_batch(cost_model, max_batch, rate):
+    # A greedy batcher dispatches whatever is queued (up to max_batch) as soon
+    # as the replica is free, so under load batches grow until the replica
+    # keeps up: the smallest batch whose throughput exceeds the arrival rate.
+    for batch in range(1, max_batch + 1):
+        if _utilization(cost_model, batch, rate) < 1:
+            return batch
+    return None
+
+
+def predict_latency(cost_model, max_batch, rate, quantile):
+    if rate <= 0:
+        return float("inf")
+    batch = operating_batch(cost_model, max_batch, rate)
+    if batch is None:
+        return float("inf")
+    service_ms = _eval(cost_model["mean"], batch)
+    rho = _utilization(cost_model, batch, rate)
+    latency = _eval(cost_model["tail"], batch)
+    if rho > 1 - quantile:
+        # Queueing delay (including the batch already in flight), approximated
+        # as exponential with the M/D/1 mean wait: service time at a fixed
+        # shape is near-constant, and its jitter is already in the tail term.
+        latency += service_ms / (2 * (1 - rho)) * math.log(rho / (1 - quantile))
+    return latency
+
+
+def max_rate_within_slo(cost_model, max_batch, slo_ms, quantile, steps=200):
+    service_s = _eval(cost_model["mean"], max_batch) / 1000
+    if service_s <= 0:
+        return 0.0
+    capacity = max_batch / service_s
+    best = 0.0
+    for i in range(1, steps):
+        rate = capacity * i / steps
+        if predict_latency(cost_model, max_batch, rate, quantile) <= slo_ms:
+            best = rate
+    if best == 0.0:
+        return 0.0
+    lo, hi = best, min(capacity, best + capacity / steps)
+    for _ in range(30):
+        mid = (lo + hi) / 2
+        if predict_latency(cost_model, max_batch, mid, quantile) <= slo_ms:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def plan_capacity(
+    runs,
+    model_name,
+    target_qps,
+    slo_ms,
+    latency_pct="p99",
+    host_cores=32,
+    max_batch=None,
+):
+    quantile = int(latency_pct[1:]) / 100
+    plans = []
+    for cost_model in fit_cost_models(runs, model_name, latency_pct):
+        threads = cost_model["config"]["threads"]
+        host_capacity = host_cores // threads
+        if host_capacity < 1:
+            continue
+        batch_limit = cost_model["max_batch"] if max_batch is None else min(max_batch, cost_model["max_batch"])
+
+        best = None
+        for batch_cap in range(1, batch_limit + 1):
+            rate_at_slo = max_rate_within_slo(cost_model, batch_cap, slo_ms, quantile)
+            if rate_at_slo <= 0:
+                continue
+            replicas = math.ceil(target_qps / rate_at_slo)
+            per_replica_qps = target_qps / replicas
+            predicted = predict_latency(cost_model, batch_cap, per_replica_qps, quantile)
+            if predicted > slo_ms:
+                continue
+            batch = operating_batch(cost_model, batch_cap, per_replica_qps)
+            hosts = math.ceil(replicas / host_capacity)
+            plan = {
+                "model": model_name,
+                "config": cost_model["config"],
+                "max_batch_size": batch_cap,
+                "batch_size": batch,
+                "hosts": hosts,
+                "replicas": replicas,
+                "replicas_per_host": _spread(replicas, hosts),
+                "host_capacity": host_capacity,
+                "per_replica_qps": per_replica_qps,
+                "utilization": _utilization(cost_model, batch, per_replica_qps),
+                "predicted_latency_ms": predicted,
+                "latency_headroom_ms": slo_ms - predicted,
+                "capacity_at_slo_qps": rate_at_slo * replicas,
+                "capacity_headroom_pct": (rate_at_slo * replicas / target_qps - 1) * 100,
+            }
+            if best is None or _plan_order(plan) < _plan_order(best):
+                best = plan
+        if best is not None:
+            plans.append(best)
+
+    plans.sort(key=_plan_order)
+    return plans
+
+
+def _spread(replicas, hosts):
+    # Replicas placed on each host when they are spread as evenly as possible.
+    return [replicas // hosts + (1 if i < replicas % hosts else 0) for i in range(hosts)]
+
+
+def _plan_order(plan):
+    return (plan["hosts"], plan["replicas"], plan["max_batch_size"], -plan["capacity_headroom_pct"])
+
+
+def format_plan(plan, latency_pct):
+    config = plan["config"]
+    flags = [config.get("device") or "cpu", config.get("executor") or "inline"]
+    if config.get("transport"):
+        flags.append(f"{config['transport']} transport")
+    flags.append("compile" if config.get("compile") else "no-compile")
+    if config.get("channels_last"):
+        flags.append("channels_last")
+    if config.get("quantize"):
+        flags.append("quantize")
+    if config.get("cache_state") == "cold":
+        flags.append("cold-cache")
+    if config.get("interference") not in (None, "none"):
+        flags.append(f"{config['interference']}-interference")
+    per_host = plan["replicas_per_host"]
+    layout = str(per_host[0]) if min(per_host) == max(per_host) else f"{min(per_host)}-{max(per_host)}"
+    return (
+        f"{plan['hosts']} hosts x {layout} replicas/host ({plan['replicas']} replicas, "
+        f"up to {plan['host_capacity']}/host): "
+        f"max_batch={plan['max_batch_size']} (~{plan['batch_size']} at target), threads={config.get('threads')}, {', '.join(flags)} "
+        f"-> {latency_pct}={plan['predicted_latency_ms']:.1f}ms "
+        f"(headroom {plan['latency_headroom_ms']:.1f}ms, capacity +{plan['capacity_headroom_pct']:.0f}%, "
+        f"util {plan['utilization']:.0%})"
+    )
+
+
+def run_plan(
+    input_path,
+    model_name,
+    target_qps,
+    slo_ms,
+    latency_pct="p99",
+    host_cores=32,
+    max_batch=None,
+    top=5,
+    out_path=None,
+):
+    runs = read_jsonl(input_path)
+    plans = plan_capacity(
+        runs, model_name, target_qps, slo_ms,
+        latency_pct=latency_pct, host_cores=host_cores, max_batch=max_batch,
+    )
+
+    print(f"Target: {target_qps:.0f} req/s of {model_name} at {latency_pct} <= {slo_ms:.1f}ms on {host_cores}-core hosts")
+    if not plans:
+        print("No configuration meets the SLO (try larger hosts, a looser SLO, or more sweep data)")
+        return None
+
+    print(f"Cheapest: {format_plan(plans[0], latency_pct)}")
+    for plan in plans[1:top]:
+        print(f"  alt: {format_plan(plan, latency_pct)}")
+
+    if out_path is not None:
+        mkdirp(os.path.dirname(out_path))
+        with open(out_path, "w") as f:
+            json.dump({
+                "model": model_name,
+                "target_qps": target_qps,
+                "slo_ms": slo_ms,
+                "latency_pct": latency_pct,
+                "host_cores": host_cores,
+                "plans": plans[:top],
+            }, f, indent=2)
+        print(f"Plan written to {out_path}")
+    return plans[0]
@@ -1,87 +1,260 @@
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from perflab.recommend import generate_recommendations, compute_balanced_score
-from perflab.utils import mkdirp, read_jsonl
+from perflab.recommend import generate_recommendations, compute_balanced_score, filter_valid_runs
+from perflab.utils import mkdirp, read_jsonl_from
 
+CACHE_VERSION = 1
+TAIL_HASH_BYTES = 4096
+TOP_N = 5
+SLIM_FIELDS = [
+    "model",
+    "batch_size",
+    "compile",
+    "threads",
+    "channels_last",
+    "quantize",
+    "latency_p95",
+    "latency_p99",
+    "throughput_rps",
+]
 
-def generate_plots(runs, plots_dir):
-    mkdirp(plots_dir)
-    models = set(r["model"] for r in runs)
-
-    for model in models:
-        model_runs = [r for r in runs if r["model"] == model]
-
-        fig, ax = plt.subplots(figsize=(8, 6))
-        x = [r["latency_p95"] for r in model_runs]
-        y = [r["throughput_rps"] for r in model_runs]
-        ax.scatter(x, y, alpha=0.6)
-        ax.set_xlabel("p95 Latency (ms)")
-        ax.set_ylabel("Throughput (req/s)")
-        ax.set_title(f"{model}: Throughput vs p95 Latency")
-        ax.grid(True, alpha=0.3)
-        plot_path = os.path.join(plots_dir, f"{model}_throughput_vs_p95.png")
-        fig.savefig(plot_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-
-        compile_groups = {}
-        for r in model_runs:
-            key = "compile" if r.get("compile") else "no-compile"
-            if key not in compile_groups:
-                compile_groups[key] = []
-            compile_groups[key].append(r)
-
-        fig, ax = plt.subplots(figsize=(8, 6))
-        for label, group in compile_groups.items():
-            batch_sizes = sorted(set(r["batch_size"] for r in group))
-            p95_by_bs = {}
-            for bs in batch_sizes:
-                bs_runs = [r for r in group if r["batch_size"] == bs]
-                if bs_runs:
-                    p95_by_bs[bs] = min(r["latency_p95"] for r in bs_runs)
-            if p95_by_bs:
-                bs_sorted = sorted(p95_by_bs.keys())
-                p95_values = [p95_by_bs[bs] for bs in bs_sorted]
-                ax.plot(bs_sorted, p95_values, marker="o", label=label)
-
-        ax.set_xlabel("Batch Size")
-        ax.set_ylabel("p95 Latency (ms)")
-        ax.set_title(f"{model}: Batch Size vs p95 Latency")
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        plot_path = os.path.join(plots_dir, f"{model}_batch_vs_p95.png")
-        fig.savefig(plot_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-
-        vision_runs = [r for r in model_runs if "preprocess_ms_per_batch" in r]
-        if vision_runs:
-            sample = vision_runs[0]
-            labels = ["Preprocess", "Forward", "Postprocess"]
-            values = [
-                sample.get("preprocess_ms_per_batch", 0),
-                sample.get("forward_ms_per_batch", 0),
-                sample.get("postprocess_ms_per_batch", 0),
+
+def _slim(run, idx):
+    slim = {k: run[k] for k in SLIM_FIELDS if k in run}
+    slim["idx"] = idx
+    return slim
+
+
+def _update_frontier(frontier, run, latency_key):
+    latency = run.get(latency_key, float("inf"))
+    throughput = run.get("throughput_rps", 0.0)
+    for other in frontier:
+        if other.get(latency_key, float("inf")) <= latency and other.get("throughput_rps", 0.0) >= throughput:
+            return frontier
+    kept = [
+        other for other in frontier
+        if not (latency <= other.get(latency_key, float("inf")) and throughput > other.get("throughput_rps", 0.0))
+    ]
+    kept.append(run)
+    return kept
+
+
+def new_model_aggregate():
+    return {
+        "hash": "",
+        "points": [],
+        "batch_p95": {},
+        "pipeline": None,
+        "top": [],
+        "best_throughput": None,
+        "best_balanced": None,
+        "frontier": {"p95": [], "p99": []},
+    }
+
+
+def update_aggregates(aggregates, runs):
+    for run in runs:
+        idx = aggregates["next_index"]
+        aggregates["next_index"] += 1
+        if aggregates["env"] is None:
+            aggregates["env"] = run.get("env", {})
+
+        model = run["model"]
+        agg = aggregates["models"].setdefault(model, new_model_aggregate())
+        slim = _slim(run, idx)
+        pipeline = [run.get(k) for k in ("preprocess_ms_per_batch", "forward_ms_per_batch", "postprocess_ms_per_batch")]
+        payload = json.dumps([agg["hash"], slim, pipeline], sort_keys=True)
+        agg["hash"] = hashlib.sha256(payload.encode()).hexdigest()
+
+        agg["points"].append([run.get("latency_p95"), run.get("throughput_rps")])
+
+        group = agg["batch_p95"].setdefault("compile" if run.get("compile") else "no-compile", {})
+        bs = str(run["batch_size"])
+        if bs not in group or run["latency_p95"] < group[bs]:
+            group[bs] = run["latency_p95"]
+
+        if agg["pipeline"] is None and "preprocess_ms_per_batch" in run:
+            agg["pipeline"] = [
+                run.get("preprocess_ms_per_batch", 0),
+                run.get("forward_ms_per_batch", 0),
+                run.get("postprocess_ms_per_batch", 0),
             ]
-            fig, ax = plt.subplots(figsize=(6, 4))
-            ax.bar(labels, values)
-            ax.set_ylabel("Time (ms)")
-            ax.set_title(f"{model}: Pipeline Breakdown (sample)")
-            ax.grid(True, alpha=0.3, axis="y")
-            plot_path = os.path.join(plots_dir, f"{model}_pipeline.png")
-            fig.savefig(plot_path, dpi=100, bbox_inches="tight")
-            plt.close(fig)
+
+        slim["score"] = compute_balanced_score(run)
+        top = agg["top"] + [slim]
+        top.sort(key=lambda r: r["score"], reverse=True)
+        agg["top"] = top[:TOP_N]
+
+        if not filter_valid_runs([run]):
+            continue
+        best = agg["best_throughput"]
+        if best is None or slim.get("throughput_rps", 0.0) > best.get("throughput_rps", 0.0):
+            agg["best_throughput"] = slim
+        best = agg["best_balanced"]
+        if best is None or slim["score"] > best["score"]:
+            agg["best_balanced"] = slim
+        for pct in agg["frontier"]:
+            agg["frontier"][pct] = _update_frontier(agg["frontier"][pct], slim, f"latency_{pct}")
+
+    return aggregates
+
+
+def build_aggregates(runs):
+    aggregates = {"next_index": 0, "env": None, "models": {}}
+    return update_aggregates(aggregates, runs)
+
+
+def recommendation_candidates(aggregates, latency_pct):
+    candidates = {}
+    for agg in aggregates["models"].values():
+        picks = list(agg["frontier"].get(latency_pct, []))
+        picks += [agg["best_throughput"], agg["best_balanced"]]
+        for run in picks:
+            if run is not None:
+                candidates[run["idx"]] = run
+    return [candidates[idx] for idx in sorted(candidates)]
+
+
+def _tail_hash(path, offset):
+    start = max(0, offset - TAIL_HASH_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _cache_path(reports_dir, input_path):
+    key = hashlib.sha1(os.path.abspath(input_path).encode()).hexdigest()[:16]
+    return os.path.join(reports_dir, ".perflab_cache", f"{key}.json")
+
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_json(path, data):
+    mkdirp(os.path.dirname(path))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
 
 
-def generate_markdown_report(runs, out_path, constraint, latency_pct, latency_budget_ms, plots_dir):
-    recs = generate_recommendations(runs, constraint, latency_pct, latency_budget_ms)
-    models = sorted(set(r["model"] for r in runs))
+def load_aggregates(input_path, cache_path, use_cache=True):
+    cache = _load_json(cache_path) if use_cache else None
+    size = os.path.getsize(input_path)
+    if (
+        cache is None
+        or cache.get("version") != CACHE_VERSION
+        or cache["offset"] > size
+        or cache["tail_hash"] != _tail_hash(input_path, cache["offset"])
+    ):
+        cache = {"version": CACHE_VERSION, "offset": 0, "aggregates": build_aggregates([])}
+
+    runs, offset = read_jsonl_from(input_path, cache["offset"])
+    if runs:
+        update_aggregates(cache["aggregates"], runs)
+    cache["offset"] = offset
+    cache["tail_hash"] = _tail_hash(input_path, offset)
+    _save_json(cache_path, cache)
+    return cache["aggregates"], len(runs)
+
+
+def _save_fig(fig, plots_dir, name):
+    fig.savefig(os.path.join(plots_dir, name), dpi=100, bbox_inches="tight")
+    plt.close(fig)
+
+
+def plot_names(model, agg):
+    names = [f"{model}_throughput_vs_p95.png", f"{model}_batch_vs_p95.png"]
+    if agg["pipeline"] is not None:
+        names.append(f"{model}_pipeline.png")
+    return names
+
+
+def generate_model_plots(model, agg, plots_dir):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    x = [p[0] for p in agg["points"]]
+    y = [p[1] for p in agg["points"]]
+    ax.scatter(x, y, alpha=0.6)
+    ax.set_xlabel("p95 Latency (ms)")
+    ax.set_ylabel("Throughput (req/s)")
+    ax.set_title(f"{model}: Throughput vs p95 Latency")
+    ax.grid(True, alpha=0.3)
+    _save_fig(fig, plots_dir, f"{model}_throughput_vs_p95.png")
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for label, p95_by_bs in agg["batch_p95"].items():
+        bs_sorted = sorted(p95_by_bs, key=int)
+        ax.plot([int(bs) for bs in bs_sorted], [p95_by_bs[bs] for bs in bs_sorted], marker="o", label=label)
+    ax.set_xlabel("Batch Size")
+    ax.set_ylabel("p95 Latency (ms)")
+    ax.set_title(f"{model}: Batch Size vs p95 Latency")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    _save_fig(fig, plots_dir, f"{model}_batch_vs_p95.png")
+
+    if agg["pipeline"] is not None:
+        fig, ax = plt.subplots(figsize=(6, 4))
+        ax.bar(["Preprocess", "Forward", "Postprocess"], agg["pipeline"])
+        ax.set_ylabel("Time (ms)")
+        ax.set_title(f"{model}: Pipeline Breakdown (sample)")
+        ax.grid(True, alpha=0.3, axis="y")
+        _save_fig(fig, plots_dir, f"{model}_pipeline.png")
+
+    return model, agg["hash"]
+
+
+def render_plots(aggregates, plots_dir, jobs=None, use_cache=True):
+    mkdirp(plots_dir)
+    hashes_path = os.path.join(plots_dir, ".plot_hashes.json")
+    plotted = (_load_json(hashes_path) if use_cache else None) or {}
+
+    todo = []
+    for model, agg in sorted(aggregates["models"].items()):
+        up_to_date = plotted.get(model) == agg["hash"] and all(
+            os.path.exists(os.path.join(plots_dir, name)) for name in plot_names(model, agg)
+        )
+        if not up_to_date:
+            todo.append((model, agg))
+
+    if len(todo) == 1 or jobs == 1:
+        done = [generate_model_plots(model, agg, plots_dir) for model, agg in todo]
+    elif todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(generate_model_plots, model, agg, plots_dir) for model, agg in todo]
+            done = [f.result() for f in futures]
+    else:
+        done = []
+
+    for model, model_hash in done:
+        plotted[model] = model_hash
+    _save_json(hashes_path, plotted)
+    return [model for model, _ in done]
+
+
+def generate_plots(runs, plots_dir, jobs=None):
+    return render_plots(build_aggregates(runs), plots_dir, jobs=jobs, use_cache=False)
+
+
+def generate_markdown_report(aggregates, out_path, constraint, latency_pct, latency_budget_ms, plots_dir):
+    candidates = recommendation_candidates(aggregates, latency_pct)
+    recs = generate_recommendations(candidates, constraint, latency_pct, latency_budget_ms)
+    models = sorted(aggregates["models"])
 
     with open(out_path, "w") as f:
         f.write("# Inference Benchmarking Report\n\n")
 
-        if runs:
-            env = runs[0].get("env", {})
+        if aggregates["env"] is not None:
+            env = aggregates["env"]
             f.write("## Environment\n\n")
             f.write(f"- Python: {env.get('python_version', 'N/A')}\n")
             f.write(f"- PyTorch: {env.get('torch_version', 'N/A')}\n")
@@ -96,20 +269,16 @@ def generate_markdown_report(runs, out_path, constraint, latency_pct, latency_bu
 
         f.write("## Top Configurations by Balanced Score\n\n")
         for model in models:
-            model_runs = [r for r in runs if r["model"] == model]
-            scored = [(r, compute_balanced_score(r)) for r in model_runs]
-            scored.sort(key=lambda x: x[1], reverse=True)
-            top5 = scored[:5]
-
             f.write(f"### {model}\n\n")
             f.write("| Batch | Compile | Threads | p95 (ms) | Throughput (req/s) | Score |\n")
             f.write("|-------|---------|---------|----------|-------------------|-------|\n")
-            for run, score in top5:
+            for run in aggregates["models"][model]["top"]:
                 bs = run["batch_size"]
                 comp = "yes" if run.get("compile") else "no"
                 threads = run.get("threads", "N/A")
                 p95 = run["latency_p95"]
                 throughput = run["throughput_rps"]
+                score = run["score"]
                 f.write(f"| {bs} | {comp} | {threads} | {p95:.1f} | {throughput:.1f} | {score:.2f} |\n")
             f.write("\n")
 
@@ -123,17 +292,26 @@ def generate_markdown_report(runs, out_path, constraint, latency_pct, latency_bu
                 f.write(f"![Pipeline Breakdown](plots/{model}_pipeline.png)\n\n")
 
 
-def generate_report(input_path, out_path="reports/latest.md", constraint="balanced", latency_pct="p95", latency_budget_ms=50.0):
-    runs = read_jsonl(input_path)
-    if not runs:
-        print(f"No runs found in {input_path}")
-        return
-
+def generate_report(
+    input_path,
+    out_path="reports/latest.md",
+    constraint="balanced",
+    latency_pct="p95",
+    latency_budget_ms=50.0,
+    jobs=None,
+    use_cache=True,
+):
     reports_dir = os.path.dirname(out_path)
     plots_dir = os.path.join(reports_dir, "plots")
     mkdirp(plots_dir)
 
-    generate_plots(runs, plots_dir)
-    generate_markdown_report(runs, out_path, constraint, latency_pct, latency_budget_ms, plots_dir)
+    aggregates, new_runs = load_aggregates(input_path, _cache_path(reports_dir, input_path), use_cache=use_cache)
+    if not aggregates["models"]:
+        print(f"No runs found in {input_path}")
+        return
+
+    rendered = render_plots(aggregates, plots_dir, jobs=jobs, use_cache=use_cache)
+    generate_markdown_report(aggregates, out_path, constraint, latency_pct, latency_budget_ms, plots_dir)
 
+    print(f"Read {new_runs} new runs, rendered plots for {len(rendered)}/{len(aggregates['models'])} models")
     print(f"Report generated: {out_path}")
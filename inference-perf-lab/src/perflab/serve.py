@@ -0,0 +1,467 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import torch
+from perflab.env import get_env_info
+from perflab.metrics import compute_percentiles, compute_throughput
+from perflab.models import get_model, is_vision_model, maybe_compile, set_torch_threads
+from perflab.preprocess import get_vision_preprocessor
+from perflab.utils import append_jsonl
+
+ENCODINGS = ["raw", "json"]
+
+_worker_state = {}
+
+
+def encode_array(arr, encoding):
+    if encoding == "raw":
+        headers = {
+            "X-Dtype": str(arr.dtype),
+            "X-Shape": ",".join(str(d) for d in arr.shape),
+        }
+        return arr.tobytes(), headers
+    elif encoding == "json":
+        payload = {"dtype": str(arr.dtype), "shape": list(arr.shape), "data": arr.ravel().tolist()}
+        return json.dumps(payload).encode(), {}
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def decode_array(body, encoding, headers):
+    if encoding == "raw":
+        shape = tuple(int(d) for d in headers["x-shape"].split(","))
+        return np.frombuffer(body, dtype=headers["x-dtype"]).reshape(shape).copy()
+    elif encoding == "json":
+        payload = json.loads(body)
+        return np.array(payload["data"], dtype=payload["dtype"]).reshape(payload["shape"])
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def create_request_array(model_name, batch_size):
+    if is_vision_model(model_name):
+        return np.random.randn(batch_size, 3, 256, 256).astype(np.float32)
+    return np.random.randint(0, 10000, size=(batch_size, 128)).astype(np.int64)
+
+
+def _load_worker_model(model_name, device, threads, compile_mode, channels_last, quantize):
+    set_torch_threads(threads)
+    model = get_model(model_name, device, quantize=quantize, channels_last=channels_last)
+    model, compile_enabled = maybe_compile(model, compile_mode)
+
+    _worker_state["model"] = model
+    _worker_state["device"] = device
+    _worker_state["channels_last"] = channels_last
+    _worker_state["preprocessor"] = get_vision_preprocessor() if is_vision_model(model_name) else None
+    _worker_state["compile_enabled"] = compile_enabled
+    return compile_enabled
+
+
+def _worker_ready():
+    # Holding each worker briefly spreads the no-ops across the whole pool.
+    time.sleep(0.05)
+    return os.getpid(), _worker_state["compile_enabled"]
+
+
+def _run_inference(body, encoding, headers):
+    t0 = time.perf_counter()
+    arr = decode_array(body, encoding, headers)
+    decode_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    inputs = torch.from_numpy(arr).to(_worker_state["device"])
+    preprocessor = _worker_state["preprocessor"]
+    if preprocessor is not None:
+        inputs = preprocessor(inputs)
+        if _worker_state["channels_last"]:
+            inputs = inputs.to(memory_format=torch.channels_last)
+    preprocess_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        outputs = _worker_state["model"](inputs)
+    forward_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    response_body, response_headers = encode_array(outputs.cpu().numpy(), encoding)
+    encode_ms = (time.perf_counter() - t0) * 1000
+
+    response_headers["X-Codec-Ms"] = f"{decode_ms + encode_ms:.6f}"
+    response_headers["X-Preprocess-Ms"] = f"{preprocess_ms:.6f}"
+    response_headers["X-Forward-Ms"] = f"{forward_ms:.6f}"
+    return response_body, response_headers
+
+
+def _format_response(status, body, headers):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+    lines = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}"]
+    for key, value in headers.items():
+        lines.append(f"{key}: {value}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _read_message(reader):
+    start_line = await reader.readline()
+    if not start_line:
+        return None, None, None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return start_line.decode("latin-1").strip(), headers, body
+
+
+class InferenceServer:
+    def __init__(
+        self,
+        model_name,
+        device="cpu",
+        executor="thread",
+        workers=1,
+        threads=1,
+        compile_mode="off",
+        channels_last=False,
+        quantize=False,
+    ):
+        if device == "cuda" and not torch.cuda.is_available():
+            device = "cpu"
+
+        load_args = (model_name, device, threads, compile_mode, channels_last, quantize)
+        if executor == "thread":
+            compile_enabled = _load_worker_model(*load_args)
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        elif executor == "process":
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_worker_model,
+                initargs=load_args,
+            )
+            try:
+                compile_enabled = self._wait_for_workers(workers)
+            except BaseException:
+                self.pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+
+        self._writers = set()
+        self.info = {
+            "model": model_name,
+            "device": device,
+            "executor": executor,
+            "workers": workers,
+            "threads": threads,
+            "compile": compile_enabled,
+            "channels_last": channels_last,
+            "quantize": quantize,
+        }
+
+    def _wait_for_workers(self, workers, timeout=600.0):
+        # Pool workers load the model in their initializer, which only runs once
+        # a task is submitted. Run no-ops until every worker has answered, so the
+        # first real request doesn't pay for model loading. Returns whether
+        # torch.compile succeeded in every worker.
+        deadline = time.monotonic() + timeout
+        ready = {}
+        while len(ready) < workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"Process pool workers did not load the model within {timeout:.0f}s")
+            futures = [self.pool.submit(_worker_ready) for _ in range(workers)]
+            ready.update(f.result(timeout=remaining) for f in futures)
+        return all(ready.values())
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        self._writers.add(writer)
+        try:
+            while True:
+                start_line, headers, body = await _read_message(reader)
+                if start_line is None:
+                    break
+                t0 = time.perf_counter()
+                method, path = start_line.split(" ")[:2]
+
+                if method == "POST" and path == "/infer":
+                    encoding = headers.get("x-encoding", "raw")
+                    try:
+                        status = 200
+                        response_body, response_headers = await loop.run_in_executor(
+                            self.pool, _run_inference, body, encoding, headers
+                        )
+                    except Exception as e:
+                        status, response_body, response_headers = 500, str(e).encode(), {}
+                elif method == "GET" and path == "/info":
+                    status, response_body, response_headers = 200, json.dumps(self.info).encode(), {}
+                elif method == "GET" and path == "/health":
+                    status, response_body, response_headers = 200, b"ok", {}
+                else:
+                    status, response_body, response_headers = 404, b"", {}
+
+                response_headers["X-Server-Ms"] = f"{(time.perf_counter() - t0) * 1000:.6f}"
+                writer.write(_format_response(status, response_body, response_headers))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def serve_forever(self, host="127.0.0.1", port=8000):
+        # SIGTERM (loadgen teardown) and Ctrl-C stop the server from inside the
+        # loop, so connections and the pool are shut down in order.
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving {self.info['model']} on http://{host}:{port} "
+              f"({self.info['executor']} pool, {self.info['workers']} workers)", flush=True)
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await server.wait_closed()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_server(
+    model_name,
+    host="127.0.0.1",
+    port=8000,
+    device="cpu",
+    executor="thread",
+    workers=1,
+    threads=1,
+    compile_mode="off",
+    channels_last=False,
+    quantize=False,
+):
+    # Until the event loop installs its own handlers, treat SIGTERM like Ctrl-C
+    # so a server stopped while loading still shuts its pool down.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = None
+    try:
+        server = InferenceServer(
+            model_name,
+            device=device,
+            executor=executor,
+            workers=workers,
+            threads=threads,
+            compile_mode=compile_mode,
+            channels_last=channels_last,
+            quantize=quantize,
+        )
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.close()
+
+
+async def _request(reader, writer, method, path, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}"]
+    for key, value in (headers or {}).items():
+        lines.append(f"{key}: {value}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    status_line, response_headers, response_body = await _read_message(reader)
+    if status_line is None:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split(" ")[1])
+    if status != 200:
+        raise RuntimeError(f"{method} {path} failed with {status}: {response_body[:200]!r}")
+    return response_headers, response_body
+
+
+async def _client_loop(host, port, arr, encoding, remaining, samples):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            t0 = time.perf_counter()
+            body, headers = encode_array(arr, encoding)
+            headers["X-Encoding"] = encoding
+            response_headers, response_body = await _request(reader, writer, "POST", "/infer", body, headers)
+            decode_array(response_body, encoding, response_headers)
+            e2e_ms = (time.perf_counter() - t0) * 1000
+            samples.append({
+                "e2e_ms": e2e_ms,
+                "server_ms": float(response_headers["x-server-ms"]),
+                "codec_ms": float(response_headers["x-codec-ms"]),
+                "preprocess_ms": float(response_headers["x-preprocess-ms"]),
+                "forward_ms": float(response_headers["x-forward-ms"]),
+            })
+    finally:
+        writer.close()
+
+
+async def _run_load(host, port, arr, encoding, requests, concurrency):
+    remaining = [requests]
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client_loop(host, port, arr, encoding, remaining, samples)
+        for _ in range(concurrency)
+    ])
+    wall_ms = (time.perf_counter() - start) * 1000
+    return samples, wall_ms
+
+
+async def _fetch_info(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await _request(reader, writer, "GET", "/info")
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+def _find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_server(host, port, proc, timeout=300.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout:.0f}s")
+
+
+def _stop_server(proc, timeout=30.0):
+    proc.terminate()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def spawn_server(model_name, port, device="cpu", executor="thread", workers=1, threads=1,
+                 compile_mode="off", channels_last=False, quantize=False):
+    cmd = [
+        sys.executable, "-m", "perflab.cli", "serve",
+        "--model", model_name,
+        "--port", str(port),
+        "--device", device,
+        "--executor", executor,
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--compile", compile_mode,
+        "--channels-last", "on" if channels_last else "off",
+        "--quantize", "on" if quantize else "off",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, env=dict(os.environ))
+    try:
+        _wait_for_server("127.0.0.1", port, proc)
+    except Exception:
+        _stop_server(proc)
+        raise
+    return proc
+
+
+def run_loadgen(
+    model_name,
+    batch_size=1,
+    requests=500,
+    warmup=20,
+    concurrency=1,
+    encoding="raw",
+    connect=None,
+    device="cpu",
+    executor="thread",
+    workers=1,
+    threads=1,
+    compile_mode="off",
+    channels_last=False,
+    quantize=False,
+    out_path="results/serve.jsonl",
+):
+    if requests < 1:
+        raise ValueError(f"requests must be at least 1, got {requests}")
+
+    proc = None
+    if connect is None:
+        host, port = "127.0.0.1", _find_free_port()
+        proc = spawn_server(
+            model_name, port, device=device, executor=executor, workers=workers, threads=threads,
+            compile_mode=compile_mode, channels_last=channels_last, quantize=quantize,
+        )
+    else:
+        host, _, port = connect.rpartition(":")
+        port = int(port)
+
+    try:
+        info = asyncio.run(_fetch_info(host, port))
+        arr = create_request_array(info["model"], batch_size)
+        if warmup > 0:
+            asyncio.run(_run_load(host, port, arr, encoding, warmup, concurrency))
+        samples, wall_ms = asyncio.run(_run_load(host, port, arr, encoding, requests, concurrency))
+    finally:
+        if proc is not None:
+            _stop_server(proc)
+
+    def mean(key):
+        return sum(s[key] for s in samples) / len(samples)
+
+    e2e = [s["e2e_ms"] for s in samples]
+    percentiles = compute_percentiles(e2e)
+    result = dict(info)
+    result.update({
+        "mode": "serve",
+        "batch_size": batch_size,
+        "requests": requests,
+        "warmup": warmup,
+        "concurrency": concurrency,
+        "encoding": encoding,
+        "latency_p50": percentiles["p50"],
+        "latency_p90": percentiles["p90"],
+        "latency_p95": percentiles["p95"],
+        "latency_p99": percentiles["p99"],
+        "throughput_rps": compute_throughput(requests * batch_size, wall_ms),
+        "end_to_end_ms_per_batch": mean("e2e_ms"),
+        "server_ms_per_batch": mean("server_ms"),
+        "codec_ms_per_batch": mean("codec_ms"),
+        "preprocess_ms_per_batch": mean("preprocess_ms"),
+        "forward_ms_per_batch": mean("forward_ms"),
+        "serving_overhead_ms_per_batch": mean("e2e_ms") - mean("forward_ms"),
+        "env": get_env_info(),
+    })
+
+    print(
+        f"e2e p50={result['latency_p50']:.2f}ms p99={result['latency_p99']:.2f}ms | "
+        f"forward={result['forward_ms_per_batch']:.2f}ms "
+        f"serving overhead={result['serving_overhead_ms_per_batch']:.2f}ms | "
+        f"{result['throughput_rps']:.1f} req/s"
+    )
+    append_jsonl(out_path, result)
+    return result
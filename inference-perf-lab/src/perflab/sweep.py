@@ -1,6 +1,8 @@
 import itertools
 import sys
+import time
 from perflab.bench import run_benchmark
+from perflab.live import ProgressPublisher, estimate_eta, format_duration
 from perflab.utils import timestamp_str
 
 
@@ -51,21 +53,49 @@ def get_sweep_configs(preset, quick=False):
     return configs
 
 
-def run_sweep(preset, out_path=None, quick=False, iters=200, warmup=20):
+def run_sweep(
+    preset,
+    out_path=None,
+    quick=False,
+    iters=200,
+    warmup=20,
+    progress_interval=5.0,
+    progress_path=None,
+    metrics_port=None,
+):
     if out_path is None:
         out_path = f"results/sweeps/{timestamp_str()}_{preset}.jsonl"
 
     configs = get_sweep_configs(preset, quick=quick)
     total = len(configs)
 
-    for i, config in enumerate(configs, 1):
-        print(f"[{i}/{total}] Running: {config}")
-        run_benchmark(
-            iters=iters,
-            warmup=warmup,
-            out_path=out_path,
-            **config,
-        )
+    publisher = None
+    if progress_path is not None or metrics_port is not None:
+        publisher = ProgressPublisher(progress_interval, jsonl_path=progress_path, metrics_port=metrics_port)
+        publisher.start(total)
+        if metrics_port is not None:
+            print(f"Live metrics at http://127.0.0.1:{metrics_port}/metrics")
+
+    durations = []
+    try:
+        for i, config in enumerate(configs, 1):
+            eta = estimate_eta(durations, total - i + 1)
+            print(f"[{i}/{total}] Running: {config} (ETA {format_duration(eta)})")
+            live = publisher.begin_config(i, config, config["batch_size"]) if publisher else None
+            start = time.perf_counter()
+            run_benchmark(
+                iters=iters,
+                warmup=warmup,
+                out_path=out_path,
+                live=live,
+                **config,
+            )
+            durations.append(time.perf_counter() - start)
+            if publisher:
+                publisher.end_config(durations[-1])
+    finally:
+        if publisher:
+            publisher.stop()
 
     print(f"Sweep complete. Results saved to {out_path}")
     return out_path
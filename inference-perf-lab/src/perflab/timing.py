@@ -1,39 +1,56 @@
+import statistics
 import time
+from array import array
 
 
-class Timer:
-    def __init__(self):
-        self.segments = {}
-        self.current_segment = None
-        self.start_time = None
-
-    def start_segment(self, name):
-        if self.current_segment:
-            self.end_segment()
-        self.current_segment = name
-        self.start_time = time.perf_counter()
-
-    def end_segment(self):
-        if self.current_segment is None:
-            return
-        elapsed = (time.perf_counter() - self.start_time) * 1000
-        if self.current_segment not in self.segments:
-            self.segments[self.current_segment] = []
-        self.segments[self.current_segment].append(elapsed)
-        self.current_segment = None
-        self.start_time = None
+class SegmentTimer:
+    def __init__(self, segments, capacity):
+        self.segments = list(segments)
+        self.stride = len(self.segments) + 1
+        self.capacity = capacity
+        self.marks = array("q", bytes(8 * self.stride * capacity))
+        self.count = 0
+
+    def get_iterations(self, segment_name):
+        k = self.segments.index(segment_name)
+        marks, stride = self.marks, self.stride
+        return [
+            (marks[i * stride + k + 1] - marks[i * stride + k]) / 1e6
+            for i in range(self.count)
+        ]
+
+    def end_to_end_ms(self):
+        marks, stride = self.marks, self.stride
+        return [
+            (marks[i * stride + stride - 1] - marks[i * stride]) / 1e6
+            for i in range(self.count)
+        ]
 
     def get_totals(self):
-        totals = {}
-        for name, times in self.segments.items():
-            totals[name] = sum(times)
-        return totals
+        return {name: sum(self.get_iterations(name)) for name in self.segments}
 
     def get_means(self):
         means = {}
-        for name, times in self.segments.items():
+        for name in self.segments:
+            times = self.get_iterations(name)
             means[name] = sum(times) / len(times) if times else 0.0
         return means
 
-    def get_iterations(self, segment_name):
-        return self.segments.get(segment_name, [])
+
+def measure_timer_overhead_ns(samples=1000):
+    now = time.perf_counter_ns
+    marks = array("q", bytes(8 * (samples + 1)))
+    for i in range(samples + 1):
+        marks[i] = now()
+    return statistics.median(marks[i + 1] - marks[i] for i in range(samples))
+
+
+def summarize_overhead(timer):
+    overhead = {"end_to_end": statistics.median(timer.end_to_end_ms()) if timer.count else 0.0}
+    for name in timer.segments:
+        overhead[name] = statistics.median(timer.get_iterations(name)) if timer.count else 0.0
+    return overhead
+
+
+def subtract_overhead(times, overhead_ms):
+    return [max(0.0, t - overhead_ms) for t in times]
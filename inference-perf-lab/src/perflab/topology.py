@@ -0,0 +1,31 @@
+import os
+
+
+def get_cpu_topology():
+    if hasattr(os, "sched_getaffinity"):
+        allowed = sorted(os.sched_getaffinity(0))
+    else:
+        allowed = list(range(os.cpu_count() or 1))
+
+    sockets = {}
+    for cpu in allowed:
+        base = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+        try:
+            with open(os.path.join(base, "physical_package_id")) as f:
+                package = int(f.read())
+            with open(os.path.join(base, "core_id")) as f:
+                core = int(f.read())
+        except (OSError, ValueError):
+            package, core = 0, cpu
+        sockets.setdefault(package, []).append((cpu, core))
+    return sockets
+
+
+def physical_cores(cpus):
+    seen = set()
+    cores = []
+    for cpu, core in cpus:
+        if core not in seen:
+            seen.add(core)
+            cores.append(cpu)
+    return cores
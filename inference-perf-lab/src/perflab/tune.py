@@ -0,0 +1,310 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+from perflab.topology import get_cpu_topology, physical_cores
+from perflab.utils import append_jsonl, mkdirp, read_jsonl, timestamp_str
+
+PROFILE_APPLIED_ENV = "PERFLAB_PROFILE_APPLIED"
+
+
+def thread_candidates(num_cpus, cores_per_socket=None, max_threads=None):
+    limit = min(num_cpus, max_threads) if max_threads else num_cpus
+    candidates = set()
+    t = 1
+    while t <= limit:
+        candidates.add(t)
+        t *= 2
+    candidates.add(limit)
+    if cores_per_socket and cores_per_socket <= limit:
+        candidates.add(cores_per_socket)
+    return sorted(candidates)
+
+
+def binding_presets(topology, threads):
+    presets = {"none": None}
+    socket_ids = sorted(topology)
+    per_socket = [physical_cores(topology[s]) for s in socket_ids]
+
+    compact = [cpu for cores in per_socket for cpu in cores][:threads]
+    if len(compact) == threads:
+        presets["compact"] = compact
+
+    if len(socket_ids) > 1:
+        spread = []
+        for i in range(max(len(cores) for cores in per_socket)):
+            for cores in per_socket:
+                if i < len(cores):
+                    spread.append(cores[i])
+        presets["spread"] = spread[:threads]
+        if threads <= len(topology[socket_ids[0]]):
+            presets["socket0"] = sorted(cpu for cpu, _ in topology[socket_ids[0]])
+    return presets
+
+
+def env_presets(threads):
+    omp = {"OMP_NUM_THREADS": str(threads), "MKL_NUM_THREADS": str(threads)}
+    return {
+        "default": {},
+        "omp_close": dict(omp, OMP_PROC_BIND="close", OMP_PLACES="cores"),
+        "omp_spread": dict(omp, OMP_PROC_BIND="spread", OMP_PLACES="cores"),
+        "kmp_compact": dict(omp, KMP_AFFINITY="granularity=fine,compact,1,0", KMP_BLOCKTIME="1"),
+        "omp_passive": dict(omp, OMP_WAIT_POLICY="PASSIVE", KMP_BLOCKTIME="0"),
+    }
+
+
+def score_trial(record, objective="latency", latency_pct="p95"):
+    if objective == "throughput":
+        return record.get("throughput_rps", 0.0)
+    return -record.get(f"latency_{latency_pct}", float("inf"))
+
+
+def run_trial(model_name, batch_size, trial, iters=100, warmup=10, compile_mode="auto"):
+    fd, tmp_path = tempfile.mkstemp(suffix=".jsonl", prefix="perflab_tune_")
+    os.close(fd)
+    cmd = [
+        sys.executable, "-m", "perflab.cli", "bench",
+        "--model", model_name,
+        "--batch-size", str(batch_size),
+        "--iters", str(iters),
+        "--warmup", str(warmup),
+        "--compile", compile_mode,
+        "--threads", str(trial["threads"]),
+        "--interop-threads", str(trial["interop_threads"]),
+        "--out", tmp_path,
+    ]
+    env = dict(os.environ)
+    env.update(trial["env"])
+    cpus = trial["cpu_affinity"]
+    preexec = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+
+    try:
+        proc = subprocess.run(cmd, env=env, preexec_fn=preexec, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Tuning trial failed:\n{proc.stderr[-2000:]}")
+        return read_jsonl(tmp_path)[-1]
+    finally:
+        os.remove(tmp_path)
+
+
+def tune_config(
+    model_name,
+    batch_size,
+    topology,
+    iters=100,
+    warmup=10,
+    compile_mode="auto",
+    objective="latency",
+    latency_pct="p95",
+    max_threads=None,
+    repeats=3,
+    min_gain=0.03,
+    out_path=None,
+):
+    num_cpus = sum(len(cpus) for cpus in topology.values())
+    cores_per_socket = len(physical_cores(topology[min(topology)]))
+    results = []
+
+    def evaluate(stage, trial):
+        # Each trial runs `repeats` times and is scored on the median run, so
+        # one noisy child process can't pick the winner.
+        records = []
+        for repeat in range(repeats):
+            record = run_trial(model_name, batch_size, trial, iters=iters, warmup=warmup, compile_mode=compile_mode)
+            record.update({
+                "mode": "tune_threads",
+                "stage": stage,
+                "repeat": repeat,
+                "env_preset": trial["env_preset"],
+                "binding": trial["binding"],
+                "cpu_affinity": trial["cpu_affinity"],
+                "tuning_env": trial["env"],
+            })
+            if out_path is not None:
+                append_jsonl(out_path, record)
+            records.append(record)
+        records.sort(key=lambda r: score_trial(r, objective, latency_pct))
+        record = records[(len(records) - 1) // 2]
+        results.append((trial, record))
+        print(
+            f"  [{stage}] threads={trial['threads']} interop={trial['interop_threads']} "
+            f"env={trial['env_preset']} bind={trial['binding']} -> "
+            f"{latency_pct}={record.get(f'latency_{latency_pct}', 0.0):.2f}ms "
+            f"throughput={record.get('throughput_rps', 0.0):.1f} req/s (median of {len(records)})"
+        )
+        return score_trial(record, objective, latency_pct)
+
+    def search(stage, trials, best):
+        # A challenger has to beat the incumbent by `min_gain` (relative), so
+        # run-to-run noise doesn't swap in settings that are no real improvement.
+        best_trial, best_score = best
+        for trial in trials:
+            score = evaluate(stage, trial)
+            if best_trial is None or score > best_score + abs(best_score) * min_gain:
+                best_trial, best_score = trial, score
+        return best_trial, best_score
+
+    # Coordinate search: the full product of all knobs is too large to run per
+    # model and batch size, and each stage mostly matters given the previous.
+    base = {"interop_threads": 1, "env_preset": "default", "env": {}, "binding": "none", "cpu_affinity": None}
+    best = (None, None)
+    best = search("threads", [
+        dict(base, threads=t) for t in thread_candidates(num_cpus, cores_per_socket, max_threads)
+    ], best)
+
+    t = best[0]["threads"]
+    best = search("interop", [
+        dict(best[0], interop_threads=i) for i in [2, 4] if i <= t
+    ], best)
+
+    best = search("env", [
+        dict(best[0], env_preset=name, env=env)
+        for name, env in env_presets(t).items() if name != "default"
+    ], best)
+
+    if hasattr(os, "sched_setaffinity"):
+        best = search("binding", [
+            dict(best[0], binding=name, cpu_affinity=cpus)
+            for name, cpus in binding_presets(topology, t).items() if name != "none"
+        ], best)
+
+    winner = best[0]
+    record = next(r for trial, r in results if trial is winner)
+    return {
+        "model": model_name,
+        "batch_size": batch_size,
+        "threads": winner["threads"],
+        "interop_threads": winner["interop_threads"],
+        "env_preset": winner["env_preset"],
+        "env": winner["env"],
+        "binding": winner["binding"],
+        "cpu_affinity": winner["cpu_affinity"],
+        "objective": objective,
+        "compile": compile_mode,
+        "latency_p95": record.get("latency_p95"),
+        "latency_p99": record.get("latency_p99"),
+        "throughput_rps": record.get("throughput_rps"),
+        "trials": len(results),
+        "repeats": repeats,
+    }
+
+
+def default_profile_path():
+    return os.path.join("profiles", f"{socket.gethostname()}.json")
+
+
+def profile_key(model_name, batch_size):
+    return f"{model_name}/bs{batch_size}"
+
+
+def load_profile(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_profile_entries(path, entries, topology):
+    profile = load_profile(path) or {"host": socket.gethostname(), "entries": {}}
+    profile["updated"] = timestamp_str()
+    profile["cpu_count"] = sum(len(cpus) for cpus in topology.values())
+    profile["sockets"] = len(topology)
+    for entry in entries:
+        profile["entries"][profile_key(entry["model"], entry["batch_size"])] = entry
+    mkdirp(os.path.dirname(path))
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def load_profile_entry(path, model_name, batch_size, compile_mode=None):
+    # Thread settings tuned with compile on don't carry over to eager runs and
+    # vice versa, so entries tuned with another compile mode are skipped.
+    # Entries written before the mode was recorded were tuned with compile off.
+    if path == "auto":
+        path = default_profile_path()
+    profile = load_profile(path)
+    if profile is None:
+        return None
+    entries = [
+        e for e in profile.get("entries", {}).values()
+        if compile_mode is None or e.get("compile", "off") == compile_mode
+    ]
+    for entry in entries:
+        if profile_key(entry["model"], entry["batch_size"]) == profile_key(model_name, batch_size):
+            return entry
+    same_model = [e for e in entries if e["model"] == model_name]
+    if not same_model:
+        return None
+    return min(same_model, key=lambda e: abs(e["batch_size"] - batch_size))
+
+
+def apply_profile_environment(entry):
+    if os.environ.get(PROFILE_APPLIED_ENV) == "1":
+        return
+    if not entry.get("env") and not entry.get("cpu_affinity"):
+        return
+    # OpenMP reads its settings once at startup and torch is already imported
+    # by the time the CLI parses arguments, so re-exec with the profile applied.
+    env = dict(os.environ)
+    env.update(entry.get("env", {}))
+    env[PROFILE_APPLIED_ENV] = "1"
+    if entry.get("cpu_affinity") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, entry["cpu_affinity"])
+    sys.stdout.flush()
+    os.execve(sys.executable, [sys.executable, "-m", "perflab.cli"] + sys.argv[1:], env)
+
+
+def run_tune_threads(
+    models,
+    batch_sizes,
+    iters=100,
+    warmup=10,
+    compile_mode="auto",
+    objective="latency",
+    latency_pct="p95",
+    max_threads=None,
+    repeats=3,
+    min_gain=0.03,
+    profile_path=None,
+    out_path="results/tune_threads.jsonl",
+):
+    if repeats < 1:
+        raise ValueError(f"repeats must be at least 1, got {repeats}")
+    if profile_path is None:
+        profile_path = default_profile_path()
+
+    topology = get_cpu_topology()
+    num_cpus = sum(len(cpus) for cpus in topology.values())
+    print(f"Host {socket.gethostname()}: {num_cpus} CPUs across {len(topology)} socket(s)")
+
+    entries = []
+    for model_name in models:
+        for batch_size in batch_sizes:
+            print(f"Tuning {model_name} batch={batch_size}")
+            entry = tune_config(
+                model_name,
+                batch_size,
+                topology,
+                iters=iters,
+                warmup=warmup,
+                compile_mode=compile_mode,
+                objective=objective,
+                latency_pct=latency_pct,
+                max_threads=max_threads,
+                repeats=repeats,
+                min_gain=min_gain,
+                out_path=out_path,
+            )
+            print(
+                f"  best: threads={entry['threads']} interop={entry['interop_threads']} "
+                f"env={entry['env_preset']} bind={entry['binding']}"
+            )
+            entries.append(entry)
+            save_profile_entries(profile_path, [entry], topology)
+
+    print(f"Profile written to {profile_path}")
+    return entries
@@ -26,3 +26,25 @@ def read_jsonl(path):
             if line:
                 records.append(json.loads(line))
     return records
+
+
+def read_jsonl_from(path, offset=0):
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].split(b"\n"):
+        line = line.strip()
+        if line:
+            records.append(json.loads(line))
+    tail = data[end:].strip()
+    if tail:
+        # An unterminated last line is either a record still being written or a
+        # hand-edited file without a trailing newline; only the latter parses.
+        try:
+            records.append(json.loads(tail))
+            end = len(data)
+        except ValueError:
+            pass
+    return records, offset + end
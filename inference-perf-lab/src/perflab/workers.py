@@ -0,0 +1,274 @@
+import multiprocessing
+import pickle
+import time
+import traceback
+from array import array
+from multiprocessing import shared_memory
+import torch
+from perflab.models import get_model, maybe_compile, set_torch_threads
+
+
+def _parse_dtype(name):
+    return getattr(torch, name.replace("torch.", ""))
+
+
+def _nbytes(shape, dtype):
+    numel = 1
+    for d in shape:
+        numel *= d
+    return numel * torch.empty((), dtype=dtype).element_size()
+
+
+def _shm_view(buf, offset, shape, dtype, channels_last=False):
+    count = 1
+    for d in shape:
+        count *= d
+    flat = torch.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+    if channels_last and len(shape) == 4:
+        n, c, h, w = shape
+        return flat.view(n, h, w, c).permute(0, 3, 1, 2)
+    return flat.view(*shape)
+
+
+class PickleTransport:
+    name = "pickle"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def setup(self, input_spec, output_spec):
+        return None
+
+    def attach(self, message):
+        pass
+
+    def send_request(self, inputs):
+        self.conn.send_bytes(pickle.dumps(inputs, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def recv_request(self):
+        data = self.conn.recv_bytes()
+        if not data:
+            return None
+        return pickle.loads(data)
+
+    def send_response(self, outputs, forward_ms):
+        self.conn.send_bytes(pickle.dumps((outputs, forward_ms), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def recv_response(self):
+        return pickle.loads(self.conn.recv_bytes())
+
+    def send_shutdown(self):
+        self.conn.send_bytes(b"")
+
+    def close(self):
+        pass
+
+
+class SharedMemoryTransport:
+    name = "shm"
+
+    def __init__(self, conn, slots=4):
+        self.conn = conn
+        self.slots = slots
+        self.shm = None
+        self.owner = False
+        self.input_views = []
+        self.output_views = []
+        self.next_slot = 0
+        self.current_slot = None
+
+    def _layout(self, input_spec, output_spec):
+        # Pad each region to a cache line so neighbouring slots never share one.
+        in_nbytes = _nbytes(input_spec[0], _parse_dtype(input_spec[1]))
+        out_nbytes = _nbytes(output_spec[0], _parse_dtype(output_spec[1]))
+        return -(-in_nbytes // 64) * 64, -(-out_nbytes // 64) * 64
+
+    def _map(self, input_spec, output_spec):
+        in_shape, in_dtype, channels_last = input_spec
+        out_shape, out_dtype = output_spec
+        in_stride, out_stride = self._layout(input_spec, output_spec)
+        out_base = in_stride * self.slots
+        for i in range(self.slots):
+            self.input_views.append(
+                _shm_view(self.shm.buf, i * in_stride, in_shape, _parse_dtype(in_dtype), channels_last)
+            )
+            self.output_views.append(
+                _shm_view(self.shm.buf, out_base + i * out_stride, out_shape, _parse_dtype(out_dtype))
+            )
+
+    def setup(self, input_spec, output_spec):
+        in_stride, out_stride = self._layout(input_spec, output_spec)
+        self.shm = shared_memory.SharedMemory(create=True, size=(in_stride + out_stride) * self.slots)
+        self.owner = True
+        self._map(input_spec, output_spec)
+        return (self.shm.name, self.slots, input_spec, output_spec)
+
+    def attach(self, message):
+        name, self.slots, input_spec, output_spec = message
+        self.shm = shared_memory.SharedMemory(name=name)
+        self._map(input_spec, output_spec)
+
+    def send_request(self, inputs):
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.slots
+        self.input_views[slot].copy_(inputs)
+        self.conn.send(slot)
+
+    def recv_request(self):
+        slot = self.conn.recv()
+        if slot is None:
+            return None
+        self.current_slot = slot
+        return self.input_views[slot]
+
+    def send_response(self, outputs, forward_ms):
+        self.output_views[self.current_slot].copy_(outputs)
+        self.conn.send((self.current_slot, forward_ms))
+
+    def recv_response(self):
+        slot, forward_ms = self.conn.recv()
+        # Copy out of the ring: the slot is reused by a later request and
+        # unmapped on close(). The copy is timed as part of the transport.
+        return self.output_views[slot].clone(), forward_ms
+
+    def send_shutdown(self):
+        self.conn.send(None)
+
+    def close(self):
+        if self.shm is None:
+            return
+        # Views must be released before the mapping can be closed.
+        self.input_views = []
+        self.output_views = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+
+TRANSPORTS = ["pickle", "shm"]
+
+
+def make_transport(name, conn, shm_slots=4):
+    if name == "pickle":
+        return PickleTransport(conn)
+    elif name == "shm":
+        return SharedMemoryTransport(conn, slots=shm_slots)
+    raise ValueError(f"Unknown transport: {name}")
+
+
+def _worker_main(conn, config):
+    try:
+        set_torch_threads(config["threads"], config["interop_threads"])
+
+        device = config["device"]
+        model = get_model(
+            config["model_name"], device,
+            quantize=config["quantize"], channels_last=config["channels_last"],
+        )
+        model, compile_enabled = maybe_compile(model, config["compile_mode"])
+
+        in_shape, in_dtype, channels_last = config["input_spec"]
+        sample = torch.zeros(in_shape, dtype=_parse_dtype(in_dtype))
+        if channels_last and sample.dim() == 4:
+            sample = sample.to(memory_format=torch.channels_last)
+        with torch.no_grad():
+            out = model(sample.to(device))
+        conn.send(("ready", compile_enabled, (list(out.shape), str(out.dtype))))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+
+    transport = make_transport(config["transport"], conn, config["shm_slots"])
+    transport.attach(conn.recv())
+    try:
+        while True:
+            inputs = transport.recv_request()
+            if inputs is None:
+                break
+            t0 = time.perf_counter()
+            with torch.no_grad():
+                outputs = model(inputs.to(device))
+            forward_ms = (time.perf_counter() - t0) * 1000
+            transport.send_response(outputs.cpu(), forward_ms)
+    finally:
+        transport.close()
+
+
+class InferenceWorker:
+    def __init__(
+        self,
+        model_name,
+        input_shape,
+        input_dtype,
+        transport="pickle",
+        device="cpu",
+        threads=None,
+        interop_threads=None,
+        compile_mode="off",
+        channels_last=False,
+        quantize=False,
+        shm_slots=4,
+    ):
+        input_spec = (list(input_shape), str(input_dtype), channels_last)
+        config = {
+            "model_name": model_name,
+            "device": device,
+            "threads": threads,
+            "interop_threads": interop_threads,
+            "compile_mode": compile_mode,
+            "channels_last": channels_last,
+            "quantize": quantize,
+            "transport": transport,
+            "shm_slots": shm_slots,
+            "input_spec": input_spec,
+        }
+
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, config), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        message = self.conn.recv()
+        if message[0] == "error":
+            self.process.join()
+            raise RuntimeError(f"Inference worker failed to start:\n{message[1]}")
+        _, self.compile_enabled, output_spec = message
+
+        self.transport = make_transport(transport, self.conn, shm_slots)
+        self.conn.send(self.transport.setup(input_spec, output_spec))
+        self.reset_stats()
+
+    def infer(self, inputs):
+        t0 = time.perf_counter()
+        self.transport.send_request(inputs)
+        outputs, forward_ms = self.transport.recv_response()
+        roundtrip_ms = (time.perf_counter() - t0) * 1000
+        n = self.stats_count
+        if n < len(self.forward_times):
+            self.forward_times[n] = forward_ms
+            self.transport_times[n] = roundtrip_ms - forward_ms
+        else:
+            self.forward_times.append(forward_ms)
+            self.transport_times.append(roundtrip_ms - forward_ms)
+        self.stats_count = n + 1
+        return outputs
+
+    def reset_stats(self, capacity=0):
+        # Preallocated like SegmentTimer's marks, so recording a call in the
+        # measured loop doesn't grow a list; calls past capacity still append.
+        self.forward_times = array("d", bytes(8 * capacity))
+        self.transport_times = array("d", bytes(8 * capacity))
+        self.stats_count = 0
+
+    def close(self):
+        try:
+            self.transport.send_shutdown()
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.transport.close()
+        self.conn.close()
@@ -0,0 +1,31 @@
+import pytest
+from perflab.coldstart import find_steady_state, summarize_trials
+
+
+def test_find_steady_state():
+    latencies = [50, 30, 20, 12, 10, 10, 10, 10, 10, 10]
+    idx, steady_ms = find_steady_state(latencies, window=3, tolerance=0.1)
+    assert steady_ms == 10
+    assert idx == 3
+
+
+def test_find_steady_state_already_steady():
+    idx, steady_ms = find_steady_state([5, 5, 5, 5], window=2)
+    assert idx == 0
+    assert steady_ms == 5
+
+
+def test_find_steady_state_empty():
+    assert find_steady_state([]) == (0, 0.0)
+
+
+def test_summarize_trials():
+    records = [
+        {"import_ms": 100, "time_to_first_inference_ms": 900},
+        {"import_ms": 300, "time_to_first_inference_ms": 1100},
+        {"import_ms": 200, "time_to_first_inference_ms": 1000},
+    ]
+    summary = summarize_trials(records)
+    assert summary["import_ms"] == 200
+    assert summary["time_to_first_inference_ms"] == 1000
+    assert summary["compile_ms"] == 0.0
@@ -0,0 +1,64 @@
+from array import array
+import pytest
+import torch
+from perflab.generate import generate_tokens, run_generation, run_generation_config
+from perflab.models import TinyTransformerDecoder
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return TinyTransformerDecoder(vocab_size=100, embed_dim=32, num_heads=2, num_layers=2, max_seq_len=32).eval()
+
+
+@pytest.mark.parametrize("static", [False, True])
+def test_cached_decode_matches_full_forward(model, static):
+    tokens = torch.randint(0, 100, (2, 10))
+    with torch.no_grad():
+        full = model(tokens)
+        cache = model.new_cache(2, static=static, max_len=16)
+        prefill = model(tokens[:, :6], cache=cache, start_pos=0)
+        steps = [model(tokens[:, i:i + 1], cache=cache, start_pos=i) for i in range(6, 10)]
+    incremental = torch.cat([prefill] + steps, dim=1)
+    assert torch.allclose(full, incremental, atol=1e-5)
+
+
+def test_chunked_prefill_with_cache(model):
+    tokens = torch.randint(0, 100, (1, 12))
+    with torch.no_grad():
+        full = model(tokens)
+        cache = model.new_cache()
+        first = model(tokens[:, :5], cache=cache, start_pos=0)
+        second = model(tokens[:, 5:], cache=cache, start_pos=5)
+    assert torch.allclose(full, torch.cat([first, second], dim=1), atol=1e-5)
+
+
+def test_static_cache_overflow(model):
+    cache = model.new_cache(1, static=True, max_len=4)
+    with torch.no_grad(), pytest.raises(ValueError):
+        model(torch.randint(0, 100, (1, 5)), cache=cache, start_pos=0)
+
+
+def test_generate_tokens_same_with_and_without_cache(model):
+    prompt = torch.randint(0, 100, (2, 5))
+    marks = array("q", bytes(8 * 7))
+    no_cache = generate_tokens(model, prompt, 6, None, marks)
+    assert all(marks[i + 1] >= marks[i] for i in range(6))
+    dynamic = generate_tokens(model, prompt, 6, model.new_cache(), marks)
+    static = generate_tokens(model, prompt, 6, model.new_cache(2, static=True, max_len=11), marks)
+    assert no_cache.shape == (2, 6)
+    assert torch.equal(no_cache, dynamic)
+    assert torch.equal(no_cache, static)
+
+
+def test_run_generation_config(model):
+    stats = run_generation_config(model, 2, 4, 5, "static", iters=3, warmup=1)
+    assert stats["cache"] == "static"
+    assert stats["ttft_p50"] > 0
+    assert stats["itl_p99"] >= stats["itl_p50"]
+    assert stats["tokens_per_sec"] > 0
+
+
+def test_run_generation_rejects_encoder():
+    with pytest.raises(ValueError):
+        run_generation(model_name="tiny_transformer")
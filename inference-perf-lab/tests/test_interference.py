@@ -0,0 +1,78 @@
+import os
+import pytest
+from perflab import interference
+from perflab.interference import (
+    CacheEvictor,
+    Interference,
+    _parse_cache_size,
+    get_llc_bytes,
+    plan_cpus,
+    release_cpus,
+    reserve_cpus,
+)
+
+# cpu -> core: cpus 0-3 are cores 0-3, cpus 4-7 their SMT siblings
+SMT_SOCKET = {0: [(0, 0), (1, 1), (2, 2), (3, 3), (4, 0), (5, 1), (6, 2), (7, 3)]}
+
+
+def test_parse_cache_size():
+    assert _parse_cache_size("32768K\n") == 32 * 1024 * 1024
+    assert _parse_cache_size("8M") == 8 * 1024 * 1024
+    assert _parse_cache_size("512") == 512
+
+
+def test_get_llc_bytes_positive():
+    assert get_llc_bytes() > 0
+
+
+def test_plan_cpus_prefers_siblings():
+    bench_cpus, hog_cpus = plan_cpus(SMT_SOCKET, threads=2, workers=3)
+    assert bench_cpus == [0, 1]
+    assert hog_cpus == [4, 5, 2]
+
+
+def test_plan_cpus_stays_on_first_socket():
+    topology = {0: [(0, 0), (1, 1)], 1: [(2, 0), (3, 1)]}
+    bench_cpus, hog_cpus = plan_cpus(topology, threads=1, workers=4)
+    assert bench_cpus == [0]
+    assert hog_cpus == [1]
+
+
+def test_cache_evictor():
+    evictor = CacheEvictor(1 << 20)
+    assert evictor.size_bytes == 1 << 20
+    evictor.evict()
+    assert evictor.dst[0] == 1 and evictor.dst[-1] == 1
+
+
+def test_interference_rejects_none():
+    with pytest.raises(ValueError):
+        Interference("none")
+
+
+@pytest.mark.parametrize("kind", ["membw", "compute"])
+def test_interference_start_stop(kind):
+    cpus = sorted(os.sched_getaffinity(0))[:1] if hasattr(os, "sched_getaffinity") else None
+    with Interference(kind, workers=2, cpus=cpus, buffer_bytes=1 << 20) as hogs:
+        assert len(hogs.processes) == 2
+        assert all(p.poll() is None for p in hogs.processes)
+        processes = list(hogs.processes)
+    assert all(p.poll() is not None for p in processes)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_setaffinity") or len(os.sched_getaffinity(0)) < 2,
+    reason="needs at least two CPUs to pin",
+)
+def test_reserve_and_release_cpus(monkeypatch):
+    original = os.sched_getaffinity(0)
+    cpus = sorted(original)
+    monkeypatch.setattr(interference, "get_cpu_topology", lambda: {0: [(cpu, i) for i, cpu in enumerate(cpus)]})
+    bench_cpus, hog_cpus, previous = reserve_cpus(threads=1, workers=1)
+    try:
+        assert bench_cpus == cpus[:1]
+        assert hog_cpus == cpus[1:2]
+        assert os.sched_getaffinity(0) == set(bench_cpus)
+    finally:
+        release_cpus(previous)
+    assert os.sched_getaffinity(0) == original
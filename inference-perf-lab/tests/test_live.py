@@ -0,0 +1,31 @@
+import pytest
+from perflab.live import LiveStats, estimate_eta, format_duration
+
+
+def test_live_stats_snapshot_before_wrap():
+    stats = LiveStats(capacity=4)
+    for v in [1.0, 2.0, 3.0]:
+        stats.record(v)
+    count, window = stats.snapshot()
+    assert count == 3
+    assert window == [1.0, 2.0, 3.0]
+
+
+def test_live_stats_snapshot_after_wrap():
+    stats = LiveStats(capacity=4)
+    for v in range(1, 7):
+        stats.record(float(v))
+    count, window = stats.snapshot()
+    assert count == 6
+    assert window == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_estimate_eta():
+    assert estimate_eta([], 10) is None
+    assert estimate_eta([10.0, 20.0], 3) == 45.0
+
+
+def test_format_duration():
+    assert format_duration(None) == "?"
+    assert format_duration(75) == "1m15s"
+    assert format_duration(3720) == "1h02m"
@@ -0,0 +1,71 @@
+import math
+from perflab.plan import fit_cost_models, fit_linear, format_plan, plan_capacity, predict_latency
+
+
+def make_runs(threads_list=(2, 4, 8), batch_sizes=(1, 2, 4, 8, 16)):
+    runs = []
+    for threads in threads_list:
+        for bs in batch_sizes:
+            mean_ms = (2.0 + 1.0 * bs) * 8 / threads
+            runs.append({
+                "model": "resnet18",
+                "compile": False,
+                "threads": threads,
+                "batch_size": bs,
+                "end_to_end_ms_per_batch": mean_ms,
+                "latency_p95": mean_ms * 1.2,
+                "latency_p99": mean_ms * 1.3,
+            })
+    return runs
+
+
+def test_fit_linear():
+    intercept, slope = fit_linear([1, 2, 4, 8], [3.0, 4.0, 6.0, 10.0])
+    assert math.isclose(intercept, 2.0)
+    assert math.isclose(slope, 1.0)
+    assert fit_linear([4, 4], [8.0, 8.0]) == (0.0, 2.0)
+    assert fit_linear([1, 2], [5.0, 4.0]) == (4.5, 0.0)
+
+
+def test_fit_cost_models_skips_other_modes():
+    runs = make_runs(threads_list=(4,)) + [dict(make_runs(threads_list=(4,))[0], mode="serve")]
+    models = fit_cost_models(runs, "resnet18")
+    assert len(models) == 1
+    assert models[0]["runs"] == 5
+    assert models[0]["max_batch"] == 16
+
+
+def test_predict_latency_grows_with_load():
+    cost_model = fit_cost_models(make_runs(threads_list=(4,)), "resnet18")[0]
+    light = predict_latency(cost_model, 8, 1.0, 0.99)
+    heavy = predict_latency(cost_model, 8, 600.0, 0.99)
+    assert light < heavy
+    assert math.isclose(light, cost_model["tail"][0] + cost_model["tail"][1])
+    assert predict_latency(cost_model, 8, 1e6, 0.99) == float("inf")
+
+
+def test_plan_capacity_meets_slo():
+    plans = plan_capacity(make_runs(), "resnet18", target_qps=2000, slo_ms=40.0, host_cores=16)
+    assert plans
+    best = plans[0]
+    assert best["predicted_latency_ms"] <= 40.0
+    assert best["replicas"] * best["per_replica_qps"] >= 2000 - 1e-6
+    assert sum(best["replicas_per_host"]) == best["replicas"]
+    assert len(best["replicas_per_host"]) == best["hosts"]
+    assert max(best["replicas_per_host"]) <= best["host_capacity"]
+    assert all(best["hosts"] <= p["hosts"] for p in plans)
+
+
+def test_plan_capacity_impossible_slo():
+    assert plan_capacity(make_runs(), "resnet18", target_qps=2000, slo_ms=1.0, host_cores=16) == []
+
+
+def test_plan_keeps_executor_and_transport_apart():
+    inline = make_runs(threads_list=(4,))
+    worker = [dict(r, executor="worker", transport="shm", end_to_end_ms_per_batch=r["end_to_end_ms_per_batch"] * 1.1)
+              for r in inline]
+    plans = plan_capacity(inline + worker, "resnet18", target_qps=500, slo_ms=40.0, host_cores=16)
+    assert {(p["config"]["executor"], p["config"]["transport"]) for p in plans} == {(None, None), ("worker", "shm")}
+    lines = {format_plan(p, "p99") for p in plans}
+    assert len(lines) == 2
+    assert any("worker, shm transport" in line for line in lines)
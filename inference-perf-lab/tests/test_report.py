@@ -0,0 +1,58 @@
+import json
+import pytest
+from perflab.recommend import generate_recommendations
+from perflab.report import build_aggregates, update_aggregates, recommendation_candidates, load_aggregates
+
+
+def _runs():
+    runs = []
+    for i in range(40):
+        runs.append({
+            "model": ["resnet18", "mobilenet"][i % 2],
+            "batch_size": [1, 2, 4, 8][i % 4],
+            "compile": i % 3 == 0,
+            "threads": [2, 4, 8][i % 3],
+            "latency_p95": float((i * 7) % 31),
+            "latency_p99": float((i * 11) % 37),
+            "throughput_rps": float((i * 13) % 17) * 50,
+        })
+    return runs
+
+
+def test_incremental_aggregates_match_full_build():
+    runs = _runs()
+    full = build_aggregates(runs)
+    incremental = build_aggregates(runs[:15])
+    update_aggregates(incremental, runs[15:])
+    assert json.dumps(full, sort_keys=True) == json.dumps(incremental, sort_keys=True)
+
+
+@pytest.mark.parametrize("constraint", ["latency", "throughput", "balanced"])
+@pytest.mark.parametrize("latency_pct", ["p95", "p99"])
+def test_recommendations_from_aggregates_match_full_runs(constraint, latency_pct):
+    runs = _runs()
+    candidates = recommendation_candidates(build_aggregates(runs), latency_pct)
+    for budget in [5.0, 20.0, 50.0]:
+        expected = generate_recommendations(runs, constraint, latency_pct, budget)
+        actual = generate_recommendations(candidates, constraint, latency_pct, budget)
+        assert actual["recommendations"] == expected["recommendations"]
+
+
+def test_load_aggregates_reads_only_appended_lines(tmp_path):
+    runs = _runs()
+    input_path = tmp_path / "runs.jsonl"
+    cache_path = str(tmp_path / "cache" / "runs.json")
+    with open(input_path, "w") as f:
+        for run in runs[:10]:
+            f.write(json.dumps(run) + "\n")
+
+    _, new_runs = load_aggregates(str(input_path), cache_path)
+    assert new_runs == 10
+
+    with open(input_path, "a") as f:
+        for run in runs[10:]:
+            f.write(json.dumps(run) + "\n")
+
+    aggregates, new_runs = load_aggregates(str(input_path), cache_path)
+    assert new_runs == 30
+    assert json.dumps(aggregates, sort_keys=True) == json.dumps(build_aggregates(runs), sort_keys=True)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import perflab
+from perflab.serve import InferenceServer, _run_load, create_request_array, decode_array, encode_array
+
+
+def _lower(headers):
+    return {k.lower(): v for k, v in headers.items()}
+
+
+@pytest.mark.parametrize("encoding", ["raw", "json"])
+def test_encode_decode_roundtrip(encoding):
+    arr = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    body, headers = encode_array(arr, encoding)
+    decoded = decode_array(body, encoding, _lower(headers))
+    assert decoded.dtype == np.float32
+    assert decoded.shape == (2, 3, 4)
+    assert np.array_equal(decoded, arr)
+
+
+def test_encode_decode_int64():
+    arr = np.array([[1, 2, 9999]], dtype=np.int64)
+    body, headers = encode_array(arr, "raw")
+    decoded = decode_array(body, "raw", _lower(headers))
+    assert decoded.dtype == np.int64
+    assert np.array_equal(decoded, arr)
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError):
+        encode_array(np.zeros(1), "msgpack")
+
+
+def test_server_and_load_thread_executor():
+    async def run():
+        server = InferenceServer("tiny_transformer", executor="thread", workers=1, threads=1)
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            arr = create_request_array("tiny_transformer", 2)
+            return await _run_load("127.0.0.1", port, arr, "raw", 4, 2)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+
+    samples, wall_ms = asyncio.run(run())
+    assert len(samples) == 4
+    assert wall_ms > 0
+    for sample in samples:
+        assert sample["forward_ms"] > 0
+        assert sample["server_ms"] >= sample["forward_ms"]
+        assert sample["e2e_ms"] >= sample["server_ms"]
+
+
+@pytest.mark.parametrize("executor,workers", [("thread", 1), ("process", 2)])
+def test_loadgen_teardown_is_quiet(tmp_path, executor, workers):
+    env = dict(os.environ)
+    src = os.path.dirname(os.path.dirname(os.path.abspath(perflab.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [
+            sys.executable, "-m", "perflab.cli", "loadgen",
+            "--model", "tiny_transformer",
+            "--executor", executor,
+            "--workers", str(workers),
+            "--threads", "1",
+            "--requests", "4",
+            "--warmup", "1",
+            "--out", str(tmp_path / "serve.jsonl"),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stderr == ""
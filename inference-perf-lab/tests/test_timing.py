@@ -0,0 +1,45 @@
+import pytest
+from perflab.timing import SegmentTimer, subtract_overhead, summarize_overhead
+
+
+def _fill(timer, iterations):
+    for i, stamps in enumerate(iterations):
+        for k, ns in enumerate(stamps):
+            timer.marks[i * timer.stride + k] = ns
+    timer.count = len(iterations)
+
+
+def test_segment_timer_durations():
+    timer = SegmentTimer(["preprocess", "forward", "postprocess"], 2)
+    _fill(timer, [
+        [0, 1_000_000, 4_000_000, 4_500_000],
+        [10_000_000, 12_000_000, 14_000_000, 14_000_000],
+    ])
+    assert timer.get_iterations("preprocess") == [1.0, 2.0]
+    assert timer.get_iterations("forward") == [3.0, 2.0]
+    assert timer.end_to_end_ms() == [4.5, 4.0]
+    assert timer.get_totals()["forward"] == 5.0
+    assert timer.get_means()["postprocess"] == 0.25
+
+
+def test_segment_timer_only_reads_recorded_iterations():
+    timer = SegmentTimer(["input", "forward", "postprocess"], 10)
+    _fill(timer, [[0, 1_000_000, 2_000_000, 2_000_000]])
+    assert timer.end_to_end_ms() == [2.0]
+    assert len(timer.marks) == 40
+
+
+def test_summarize_overhead():
+    timer = SegmentTimer(["input", "forward", "postprocess"], 3)
+    _fill(timer, [
+        [0, 100, 300, 400],
+        [0, 100, 500, 600],
+        [0, 100, 400, 500],
+    ])
+    overhead = summarize_overhead(timer)
+    assert overhead["forward"] == pytest.approx(0.0003)
+    assert overhead["end_to_end"] == pytest.approx(0.0005)
+
+
+def test_subtract_overhead_clamps_at_zero():
+    assert subtract_overhead([1.0, 0.2], 0.5) == [0.5, 0.0]
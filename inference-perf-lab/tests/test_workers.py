@@ -0,0 +1,62 @@
+import multiprocessing
+import pytest
+import torch
+from perflab.workers import PickleTransport, SharedMemoryTransport, make_transport
+
+
+def _roundtrip(parent, worker, inputs):
+    parent.send_request(inputs)
+    received = worker.recv_request()
+    worker.send_response(received * 2, 1.5)
+    return received, parent.recv_response()
+
+
+def test_pickle_transport_roundtrip():
+    a, b = multiprocessing.Pipe()
+    parent, worker = PickleTransport(a), PickleTransport(b)
+    inputs = torch.randn(2, 3)
+    received, (outputs, forward_ms) = _roundtrip(parent, worker, inputs)
+    assert torch.equal(received, inputs)
+    assert torch.equal(outputs, inputs * 2)
+    assert forward_ms == 1.5
+
+
+def test_shm_transport_roundtrip():
+    a, b = multiprocessing.Pipe()
+    parent, worker = SharedMemoryTransport(a, slots=2), SharedMemoryTransport(b)
+    worker.attach(parent.setup(([2, 3], "torch.float32", False), ([2, 3], "torch.float32")))
+    try:
+        history = []
+        for _ in range(3):
+            inputs = torch.randn(2, 3)
+            received, (outputs, forward_ms) = _roundtrip(parent, worker, inputs)
+            assert torch.equal(received, inputs)
+            assert torch.equal(outputs, inputs * 2)
+            history.append((inputs, outputs))
+    finally:
+        worker.close()
+        parent.close()
+    # Responses are copied out of the ring, so slot reuse and close() leave them intact.
+    for inputs, outputs in history:
+        assert torch.equal(outputs, inputs * 2)
+
+
+def test_shm_transport_channels_last_view():
+    a, b = multiprocessing.Pipe()
+    parent, worker = SharedMemoryTransport(a, slots=1), SharedMemoryTransport(b)
+    spec = ([1, 3, 4, 4], "torch.float32", True)
+    worker.attach(parent.setup(spec, ([1, 3, 4, 4], "torch.float32")))
+    try:
+        inputs = torch.randn(1, 3, 4, 4)
+        received, _ = _roundtrip(parent, worker, inputs)
+        assert received.is_contiguous(memory_format=torch.channels_last)
+        assert torch.equal(received, inputs)
+    finally:
+        worker.close()
+        parent.close()
+
+
+def test_unknown_transport():
+    a, _ = multiprocessing.Pipe()
+    with pytest.raises(ValueError):
+        make_transport("grpc", a)